@@ -2,12 +2,114 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connection, transaction
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
+from urllib.parse import urlencode
 from datetime import timedelta
 
 from .models import Post, Comment, Notification, Genre, SiteSettings, Profile
+from . import homepage, moderation, profiles, stats
+from .listings import approved_comment_count
+from .threads import bump_thread_version
+
+
+# =======================
+# Changelist helpers for big tables
+# =======================
+# Below this many rows an exact COUNT is cheap enough to keep.
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+_ROW_ESTIMATE_SQL = {
+    'postgresql': "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+    # Filled in by ANALYZE; the first number of a table's stat is its row count.
+    'sqlite': "SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s LIMIT 1",
+    'mysql': "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+}
+
+
+def estimated_row_count(model):
+    """The database's own estimate of the table size, or None if it has none."""
+    sql = _ROW_ESTIMATE_SQL.get(connection.vendor)
+    if sql is None:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return row[0] if row and row[0] and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner's row estimate instead of COUNT(*) for unfiltered
+    changelists of large tables; filtered lists are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Filters on a foreign key chosen through the admin's autocomplete endpoint,
+    so the sidebar does not list every related row. ``field_name`` must be in
+    the model admin's ``autocomplete_fields``.
+    """
+    template = 'admin/blog/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        opts = model._meta
+        self.autocomplete_url = reverse('admin:autocomplete') + '?' + urlencode({
+            'app_label': opts.app_label, 'model_name': opts.model_name, 'field_name': self.field_name,
+        })
+        self.selected = None
+        if self.value() and self.value().isdigit():
+            related = opts.get_field(self.field_name).related_model
+            self.selected = related._default_manager.filter(pk=self.value()).first()
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'All',
+        }
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(**{f'{self.field_name}_id': self.value()})
+        return queryset
+
+
+class PostFilter(AutocompleteFilter):
+    title = 'post'
+    parameter_name = 'post'
+    field_name = 'post'
+
+
+class AuthorFilter(AutocompleteFilter):
+    title = 'author'
+    parameter_name = 'author'
+    field_name = 'author'
 
 
 # =======================
@@ -24,16 +126,22 @@ class UserAdmin(BaseUserAdmin):
     inlines = (ProfileInline,)
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff')
     actions = ['ban_for_7_days']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_inline_instances(self, request, obj=None):
+        # New users get their profile from a post_save signal; edit it once the user exists.
+        return super().get_inline_instances(request, obj) if obj else []
 
     def ban_for_7_days(self, request, queryset):
         """Custom action: ban users from commenting for 7 days"""
         ban_until = timezone.now() + timedelta(days=7)
-        updated = 0
-        for user in queryset:
-            profile, _ = Profile.objects.get_or_create(user=user)
-            profile.comment_ban_until = ban_until
-            profile.save()
-            updated += 1
+        with transaction.atomic():
+            Profile.objects.bulk_create(
+                [Profile(user_id=pk) for pk in queryset.filter(profile__isnull=True).values_list('pk', flat=True)],
+                ignore_conflicts=True,
+            )
+            updated = Profile.objects.filter(user__in=queryset.values('pk')).update(comment_ban_until=ban_until)
         self.message_user(request, f"🚫 Successfully banned {updated} user(s) from commenting for 7 days.")
     ban_for_7_days.short_description = "Ban selected users from commenting for 7 days"
 
@@ -59,13 +167,27 @@ class GenreAdmin(admin.ModelAdmin):
 class PostAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'genre', 'comment_count', 'photo_thumbnail', 'created_at')
     search_fields = ('title', 'content', 'author__username')
-    list_filter = ('created_at', 'author', 'genre')
+    list_filter = ('created_at', AuthorFilter, 'genre')
+    list_select_related = ('author', 'genre')
+    autocomplete_fields = ('author',)
     ordering = ('-created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(approved_comment_count=approved_comment_count())
+
+    def get_search_fields(self, request):
+        # Autocomplete lookups run on every keystroke; keep them off the post bodies.
+        if request.path == reverse('admin:autocomplete'):
+            return ('title',)
+        return super().get_search_fields(request)
 
     def comment_count(self, obj):
         """Counts only approved comments for the post"""
-        return obj.comments.filter(status='approved').count()
+        return obj.approved_comment_count
     comment_count.short_description = 'Comments'
+    comment_count.admin_order_field = 'approved_comment_count'
 
     def photo_thumbnail(self, obj):
         """Renders a small image preview of the post photo"""
@@ -87,9 +209,14 @@ class CommentAdmin(admin.ModelAdmin):
         'truncated_text', 'author', 'post_link',
         'display_status', 'toxicity_label', 'created_at'
     )
-    list_filter = ('status', 'created_at', 'post')
+    list_filter = ('status', 'created_at', PostFilter, AuthorFilter)
     search_fields = ('text', 'author__username', 'post__title')
-    ordering = ('-created_at',)
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('post', 'author', 'parent')
+    # Newest first by primary key: the pk index serves it without a sort.
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     actions = [
         'approve_comments',
@@ -106,7 +233,7 @@ class CommentAdmin(admin.ModelAdmin):
 
     def post_link(self, obj):
         """Clickable link to edit the related Post in admin"""
-        url = reverse("admin:blog_post_change", args=[obj.post.id])
+        url = reverse("admin:blog_post_change", args=[obj.post_id])
         return format_html('<a href="{}">{}</a>', url, obj.post.title)
     post_link.short_description = 'Post'
 
@@ -123,30 +250,45 @@ class CommentAdmin(admin.ModelAdmin):
     display_status.short_description = 'Status'
     display_status.admin_order_field = 'status'
 
+    def get_queryset(self, request):
+        # Rows only show the post title; never load post bodies.
+        return super().get_queryset(request).defer('post__content', 'post__excerpt')
+
     # --- Actions ---
+    def _set_status(self, queryset, status):
+        """Bulk status change; retires the cached threads of the touched posts once it commits."""
+        with transaction.atomic():
+            touched = list(queryset.values_list('post_id', 'author_id'))
+            updated = queryset.update(status=status)
+            for post_id in {post_id for post_id, _ in touched}:
+                transaction.on_commit(lambda post_id=post_id: bump_thread_version(post_id))
+            transaction.on_commit(homepage.invalidate)
+            stats.recount('comments_to_moderate')
+            profiles.recount({author_id for _, author_id in touched})
+        return updated
+
     def approve_comments(self, request, queryset):
-        updated = queryset.update(status='approved')
+        updated = moderation.decide(queryset, 'approve')
         self.message_user(request, f"✅ Approved {updated} comment(s).")
     approve_comments.short_description = "Approve selected comments"
 
     def mark_as_pending(self, request, queryset):
-        updated = queryset.update(status='pending_review')
+        updated = self._set_status(queryset, 'pending_review')
         self.message_user(request, f"⏳ Marked {updated} comment(s) as pending.")
     mark_as_pending.short_description = "Mark as Pending Review"
 
     def mark_as_reported(self, request, queryset):
-        updated = queryset.update(status='reported')
+        updated = self._set_status(queryset, 'reported')
         self.message_user(request, f"🚩 Reported {updated} comment(s).")
     mark_as_reported.short_description = "Mark as Reported"
 
     def reject_comments(self, request, queryset):
-        updated = queryset.update(status='rejected')
+        updated = moderation.decide(queryset, 'reject')
         self.message_user(request, f"❌ Rejected {updated} comment(s).")
     reject_comments.short_description = "Reject selected comments"
 
     def delete_comments(self, request, queryset):
-        deleted = queryset.count()
-        queryset.delete()
+        deleted = moderation.decide(queryset, 'delete')
         self.message_user(request, f"🗑️ Deleted {deleted} comment(s).")
     delete_comments.short_description = "Delete selected comments"
 
@@ -164,6 +306,11 @@ class UserInquiryAdmin(admin.ModelAdmin):
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('user', 'message', 'created_at', 'read')
     list_filter = ('read', 'created_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'comment', 'post')
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 # =======================
@@ -0,0 +1,54 @@
+# File: blog/consumers.py
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import notification_group, post_group
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """Streams a user's new notifications and unread count to the navbar."""
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+        self.group_name = notification_group(user.pk)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def notification_push(self, event):
+        await self.send_json({
+            "id": event["id"],
+            "html": event["html"],
+            "unread_count": event["unread_count"],
+        })
+
+
+class PostCommentsConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Streams new comments and vote counts to everyone reading a post. Votes
+    arrive already batched per post (see blog.realtime.broadcast_votes).
+    """
+
+    async def connect(self):
+        self.group_name = post_group(self.scope["url_route"]["kwargs"]["pk"])
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def comment_new(self, event):
+        await self.send_json({
+            "type": "comment",
+            "id": event["id"],
+            "parent_id": event["parent_id"],
+            "html": event["html"],
+        })
+
+    async def comment_votes(self, event):
+        await self.send_json({"type": "votes", "votes": event["votes"]})
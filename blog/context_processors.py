@@ -1,19 +1,49 @@
+import time
+
+from django.utils.functional import SimpleLazyObject
+
 from .models import Notification, Genre, SiteSettings
+from .notifications import unread_count
+
+# Genres and site settings change rarely, so they are kept in a process-local
+# cache. Save/delete signals clear it in this process; the timeout bounds how
+# long other processes can serve a stale copy.
+SITE_CACHE_TIMEOUT = 60 * 5
+_site_cache = {}
+
+
+def _cached(key, loader):
+    entry = _site_cache.get(key)
+    if entry is None or entry[1] < time.monotonic():
+        entry = (loader(), time.monotonic() + SITE_CACHE_TIMEOUT)
+        _site_cache[key] = entry
+    return entry[0]
+
+
+def invalidate_site_cache(key):
+    _site_cache.pop(key, None)
+
 
 def extras_context(request):
     """
     Makes extra data available globally to all templates.
+    Everything here is lazy: a query only runs if the template uses the value.
     """
+    # AJAX fragments (comments, replies, notification lists) never use these.
+    if request.headers.get("x-requested-with") == "XMLHttpRequest":
+        return {}
+
     context = {
-        'all_genres': Genre.objects.all(),
-        'site_settings': SiteSettings.objects.first(),
+        'all_genres': SimpleLazyObject(lambda: _cached('genres', lambda: list(Genre.objects.all()))),
+        'site_settings': SimpleLazyObject(lambda: _cached('site_settings', SiteSettings.objects.first)),
         'notifications': [],
         'unread_notifications_count': 0,
     }
 
-    if request.user.is_authenticated:
-        notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-        context['notifications'] = notifications[:5]  # Show top 5 in navbar dropdown
-        context['unread_notifications_count'] = notifications.filter(read=False).count()
+    user = request.user
+    if user.is_authenticated:
+        notifications = Notification.objects.filter(user=user).select_related('comment').order_by('-created_at')
+        context['notifications'] = SimpleLazyObject(lambda: list(notifications[:5]))  # Show top 5 in navbar dropdown
+        context['unread_notifications_count'] = SimpleLazyObject(lambda: unread_count(user.pk))
 
     return context
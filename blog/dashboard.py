@@ -0,0 +1,98 @@
+# File: blog/dashboard.py
+"""
+Data for a user's own dashboard.
+
+The page itself only renders badge counts and the author statistics; every
+tab is fetched separately, a page at a time, newest first. Pages use a keyset
+cursor over ``(created_at, id)`` so each one is a short range read of the
+author/user index however long the history is. Author statistics are one
+aggregate query, cached per user for AUTHOR_STATS_TIMEOUT and dropped when
+the author's posts change.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db.models import Count, Min, Q
+
+from .models import Comment, Notification, Post
+
+
+TAB_PAGE_SIZE = 20
+AUTHOR_STATS_TIMEOUT = 60 * 10
+TABS = ('action', 'posts', 'comments', 'notifications')
+
+
+# ------------------ Author statistics ------------------
+def _author_stats_key(user_id):
+    return f"author-stats:{user_id}"
+
+
+def author_stats(user):
+    """
+    ``{'total_posts', 'total_comments_received', 'first_post_at'}`` for
+    ``user``, or ``None`` if they have not written a post yet.
+    """
+    key = _author_stats_key(user.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = Post.objects.filter(author=user).aggregate(
+            total_posts=Count('pk', distinct=True),
+            total_comments_received=Count('comments'),
+            first_post_at=Min('created_at'),
+        )
+        cache.set(key, stats, AUTHOR_STATS_TIMEOUT)
+    return stats if stats['total_posts'] else None
+
+
+def forget_author_stats(user_id):
+    cache.delete(_author_stats_key(user_id))
+
+
+# ------------------ Tabs ------------------
+def encode_cursor(obj):
+    raw = f"{obj.created_at.isoformat()}|{obj.pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns ``(created_at, pk)`` or ``None`` for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def _tab_queryset(user, tab):
+    if tab == 'action':
+        return Comment.objects.filter(author=user, status='pending_review').only('pk', 'text', 'created_at')
+    if tab == 'posts':
+        return Post.objects.filter(author=user).only('pk', 'title', 'created_at')
+    if tab == 'comments':
+        return Comment.objects.filter(author=user).only('pk', 'post_id', 'text', 'created_at')
+    return Notification.objects.filter(user=user).select_related('comment').only(
+        'pk', 'message', 'created_at', 'read', 'notification_type', 'post_id', 'comment__id', 'comment__post_id',
+    )
+
+
+def tab_page(user, tab, cursor=None, page_size=TAB_PAGE_SIZE):
+    """
+    Returns ``(items, next_cursor)`` for one page of a dashboard tab;
+    ``next_cursor`` is ``None`` on the last page.
+    """
+    if tab not in TABS:
+        raise ValueError(f"Unknown dashboard tab: {tab}")
+    items = _tab_queryset(user, tab)
+    after = decode_cursor(cursor)
+    if after:
+        created_at, pk = after
+        items = items.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    items = list(items.order_by('-created_at', '-pk')[:page_size + 1])
+    if len(items) > page_size:
+        return items[:page_size], encode_cursor(items[page_size - 1])
+    return items, None
@@ -0,0 +1,74 @@
+# File: blog/homepage.py
+"""
+Slow-changing homepage data: the featured post, the popular sidebar and the
+latest approved comments.
+
+The snapshot is kept in the cache with no expiry, next to a short-lived
+"fresh" marker. Once the marker is gone (it timed out, or a post/comment
+change deleted it) the next request takes a refresh lock and recomputes while
+every other request keeps serving the old snapshot, so an expiry under load
+causes one recomputation instead of one per request.
+"""
+from django.core.cache import cache
+
+from . import trending
+from .listings import card_queryset
+from .models import Comment, Post
+
+
+SNAPSHOT_KEY = 'homepage-aggregates'
+FRESH_KEY = 'homepage-aggregates:fresh'
+LOCK_KEY = 'homepage-aggregates:lock'
+HOMEPAGE_TTL = 60
+# Upper bound on one refresh; a crashed refresher cannot hold the lock longer.
+REFRESH_LOCK_TIMEOUT = 30
+POPULAR_POSTS = 5
+RECENT_COMMENTS = 5
+
+
+def compute_snapshot():
+    # An admin pick wins; otherwise the post with the best trending score. At
+    # most one post is featured, so no ORDER BY: the partial index is read as is.
+    featured_post = next(iter(card_queryset(Post.objects.filter(is_featured=True)).order_by()[:1]), None)
+    if not featured_post:
+        featured_post = card_queryset(trending.ranked_posts()).first()
+
+    popular_posts = trending.ranked_posts().defer('content')
+    if featured_post:
+        popular_posts = popular_posts.exclude(pk=featured_post.pk)
+
+    return {
+        'featured_post': featured_post,
+        'popular_posts': list(popular_posts[:POPULAR_POSTS]),
+        'recent_comments': list(
+            Comment.objects.filter(status="approved")
+            .select_related('author', 'post')
+            .defer('post__content')
+            .order_by("-created_at")[:RECENT_COMMENTS]
+        ),
+    }
+
+
+def refresh():
+    snapshot = compute_snapshot()
+    cache.set(SNAPSHOT_KEY, snapshot, None)
+    cache.set(FRESH_KEY, True, HOMEPAGE_TTL)
+    return snapshot
+
+
+def get_snapshot():
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None:
+        # Nothing to fall back on (cold cache): compute in-line.
+        return refresh()
+    if cache.get(FRESH_KEY) is None and cache.add(LOCK_KEY, True, REFRESH_LOCK_TIMEOUT):
+        try:
+            snapshot = refresh()
+        finally:
+            cache.delete(LOCK_KEY)
+    return snapshot
+
+
+def invalidate():
+    """Marks the snapshot stale; the next request refreshes it."""
+    cache.delete(FRESH_KEY)
@@ -0,0 +1,79 @@
+# File: blog/listings.py
+"""
+Keyset pagination for post listings.
+
+Listings are ordered newest first by (created_at, id). A page is read as "the
+next N posts after the last one shown", which the (genre, created_at, id)
+index answers directly, so deep pages cost the same as the first one.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Post
+
+
+POSTS_PER_PAGE = 6
+
+
+def approved_comment_count():
+    """Annotation counting a post's approved comments."""
+    # A correlated subquery rather than JOIN + GROUP BY: with ORDER BY ... LIMIT
+    # only the rows of the page are counted, instead of every post first.
+    approved_comments = (
+        Comment.objects.filter(post=OuterRef('pk'), status='approved')
+        .order_by()
+        .values('post')
+        .annotate(n=Count('pk'))
+        .values('n')
+    )
+    return Coalesce(Subquery(approved_comments), 0)
+
+
+def card_queryset(queryset=None):
+    """
+    Posts for listing cards, with everything a card shows fetched up front:
+    author and genre are joined in, ``approved_comment_count`` is annotated,
+    and the body is deferred since cards show the stored excerpt.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    return (
+        queryset.select_related('author', 'genre')
+        .defer('content')
+        .annotate(approved_comment_count=approved_comment_count())
+    )
+
+
+def encode_cursor(post):
+    raw = f"{post.created_at.isoformat()}|{post.pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns ``(created_at, pk)`` or ``None`` for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def posts_page(queryset, cursor=None, page_size=POSTS_PER_PAGE):
+    """Returns ``(posts, next_cursor)``; ``next_cursor`` is ``None`` on the last page."""
+    after = decode_cursor(cursor)
+    if after:
+        created_at, pk = after
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+    posts = list(queryset.order_by('-created_at', '-pk')[:page_size + 1])
+    next_cursor = None
+    if len(posts) > page_size:
+        posts = posts[:page_size]
+        next_cursor = encode_cursor(posts[-1])
+    return posts, next_cursor
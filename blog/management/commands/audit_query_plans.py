@@ -0,0 +1,138 @@
+# File: blog/management/commands/audit_query_plans.py
+"""
+Runs the representative queries of the busiest views through the database's
+query planner (EXPLAIN QUERY PLAN on SQLite) and flags unbounded scans and
+temporary B-trees built for ORDER BY / GROUP BY. A scan is fine only when it
+reads a covering or partial index, or when the query is a LIMIT over an
+unfiltered index in its own order; any other SCAN, with or without an index,
+reads the whole table or index. With --time each query is also executed and
+its median run time reported.
+"""
+import re
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from blog import threads, trending
+from blog.listings import card_queryset
+from blog.models import Comment, Notification, Post, Profile, UserInquiry
+
+
+_PLAN_PREFIX = re.compile(r'^[\s\d|`-]*')
+_SCAN = re.compile(r'^SCAN (?P<target>\S+)(?: USING (?P<covering>COVERING )?INDEX (?P<index>\S+))?')
+# Intermediate results (subqueries, CTEs, window "qualify" steps) are named here.
+_INTERMEDIATE = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (?P<name>\S+)')
+
+
+def workload():
+    """``[(name, queryset)]``: the queries behind the hot views, against sample rows."""
+    post = Post.objects.order_by('-pk').first()
+    post_id = post.pk if post else 0
+    genre_id = post.genre_id if post and post.genre_id else 0
+    user_id = User.objects.order_by('pk').values_list('pk', flat=True).first() or 0
+    now = timezone.now()
+    approved_roots = Comment.objects.filter(post_id=post_id, parent__isnull=True, status='approved')
+    root_paths = list(approved_roots.order_by('-created_at', '-id').values_list('path', flat=True)[:10]) or ['0']
+    return [
+        ('post_list: newest cards', card_queryset().order_by('-created_at')[:5]),
+        ('post_list: featured post', card_queryset(Post.objects.filter(is_featured=True)).order_by()[:1]),
+        ('post_list: trending posts', trending.ranked_posts().defer('content')[:5]),
+        ('post_list: recent comments', Comment.objects.filter(status='approved').order_by('-created_at')[:5]),
+        ('genre_posts: newest in genre', Post.objects.filter(genre_id=genre_id).order_by('-created_at', '-pk')[:7]),
+        ('post_detail: newest top-level comments', approved_roots.order_by('-created_at', '-id')[:11]),
+        ('post_detail: top top-level comments', approved_roots.order_by('-score', '-id')[:11]),
+        ('post_detail: reply subtrees of a page', Comment.objects.filter(
+            threads.subtree_filter(post_id, root_paths), status='approved', parent__isnull=False,
+        ).order_by()),
+        ('comment_replies: one subtree', Comment.objects.filter(
+            threads.subtree_filter(post_id, root_paths[:1]), status='approved',
+        ).order_by('path')),
+        ('profile_page: posts', Post.objects.filter(author_id=user_id).order_by('-created_at')),
+        ('profile_page: comments', Comment.objects.filter(author_id=user_id, status='approved').order_by('-created_at')),
+        ('navbar: unread notifications', Notification.objects.filter(user_id=user_id, read=False).order_by('-created_at')[:5]),
+        ('dashboard: notifications', Notification.objects.filter(user_id=user_id).order_by('-created_at')[:20]),
+        ('admin_comments: moderation queue (per status)', Comment.objects.filter(
+            status='pending_review'
+        ).order_by('-report_count', 'created_at', 'id')[:21]),
+        ('admin_dashboard: banned users', Profile.objects.filter(comment_ban_until__gt=now)),
+        ('admin_inquiries: by status', UserInquiry.objects.filter(status='new').order_by('-submitted_at')),
+    ]
+
+
+def partial_indexes():
+    """Names of the partial indexes; scanning one only reads the rows it covers."""
+    if connection.vendor != 'sqlite':
+        return set()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql LIKE '% WHERE %'")
+        return {name for name, in cursor.fetchall()}
+
+
+def is_bounded(queryset):
+    """A LIMIT with no WHERE: an index scan in the query's order stops after LIMIT rows."""
+    query = queryset.query
+    return query.is_sliced and not query.where
+
+
+def plan_problems(plan, bounded=False, partial=frozenset()):
+    """Lines of a plan that mean an unbounded scan or a temporary B-tree."""
+    problems, intermediate = [], set()
+    for line in plan.splitlines():
+        # SQLite plan rows look like "4 0 0 SCAN blog_comment"; drop the ids.
+        detail = _PLAN_PREFIX.sub('', line)
+        match = _INTERMEDIATE.match(detail)
+        if match:
+            intermediate.add(match['name'])
+        scan = _SCAN.match(detail)
+        if scan and scan['target'] not in intermediate and not scan['target'].startswith('('):
+            if not scan['index']:
+                problems.append(f"full scan: {detail}")
+            elif not (scan['covering'] or scan['index'] in partial or bounded):
+                problems.append(f"full index scan: {detail}")
+        elif 'USE TEMP B-TREE' in detail:
+            problems.append(f"temp b-tree: {detail}")
+    return problems
+
+
+def median_runtime(queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset.all())
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = "Explains the queries behind the hot views and flags unbounded scans and temporary B-trees."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Also write the report to this file.")
+        parser.add_argument('--time', action='store_true', help="Execute each query and report its median run time.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query with --time.")
+
+    def handle(self, *args, **options):
+        lines, flagged = [], 0
+        queries, partial = workload(), partial_indexes()
+        for name, queryset in queries:
+            plan = queryset.explain()
+            problems = plan_problems(plan, is_bounded(queryset), partial)
+            flagged += bool(problems)
+            header = f"[{'WARN' if problems else ' OK '}] {name}"
+            if options['time']:
+                header += f"  ({median_runtime(queryset, options['repeat']) * 1000:.2f} ms)"
+            lines.append(header)
+            lines.extend(f"    {line}" for line in plan.splitlines())
+            lines.extend(f"    !! {problem}" for problem in problems)
+            lines.append("")
+        lines.append(f"{flagged} of {len(queries)} queries need attention.")
+
+        report = "\n".join(lines)
+        self.stdout.write(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(report + "\n")
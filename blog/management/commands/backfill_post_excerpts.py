@@ -0,0 +1,25 @@
+# File: blog/management/commands/backfill_post_excerpts.py
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = "Recomputes the stored excerpt, word count and reading time of every post."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Posts updated per batch.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = Post.objects.only('pk', 'content').order_by('pk')
+        batch, total = [], 0
+        for post in posts.iterator(chunk_size=batch_size):
+            post.refresh_reading_metadata()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                total += Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'reading_time'])
+                batch = []
+        if batch:
+            total += Post.objects.bulk_update(batch, ['excerpt', 'word_count', 'reading_time'])
+        self.stdout.write(self.style.SUCCESS(f"Updated {total} post(s)."))
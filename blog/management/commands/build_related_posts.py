@@ -0,0 +1,25 @@
+# File: blog/management/commands/build_related_posts.py
+from django.core.management.base import BaseCommand
+
+from blog import related
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the related-posts lists of every post from TF-IDF similarity. "
+        "With --pending, only the lists affected by queued post changes (run every few minutes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pending', action='store_true',
+            help="Process the posts queued by saves and deletes instead of rebuilding everything.",
+        )
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            count = related.update_pending()
+            self.stdout.write(self.style.SUCCESS(f"Stored related posts for {count} post(s)."))
+            return
+        count, terms = related.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Stored related posts for {count} post(s) ({terms} terms)."))
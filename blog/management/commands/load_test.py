@@ -0,0 +1,186 @@
+# File: blog/management/commands/load_test.py
+"""
+Drives the hot endpoints of a running server concurrently and reports
+throughput and latency percentiles per endpoint.
+
+Each worker logs in as one of the seed users (see ``seed_scale``) and issues a
+weighted mix of page views, comment sorting, votes, new comments and
+notification polls against the posts and comments that exist in the database.
+Point it at a server started with the settings under test, e.g.
+``manage.py load_test --base-url http://127.0.0.1:8000 --duration 60``.
+"""
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from blog.management.commands.seed_scale import SEED_PASSWORD
+from blog.models import Comment, Post
+
+
+# (name, weight). Reads dominate, as they do in production traffic.
+SCENARIOS = (
+    ("post_list", 20),
+    ("post_detail", 30),
+    ("sort_comments", 15),
+    ("comment_action", 10),
+    ("add_comment", 5),
+    ("notification_count", 15),
+    ("notification_html", 5),
+)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+class Client:
+    """A cookie-keeping HTTP client for one simulated user."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def csrf_token(self):
+        return next((c.value for c in self.cookies if c.name == "csrftoken"), "")
+
+    def request(self, path, data=None, ajax=False):
+        headers = {"Referer": self.base_url + path}
+        if ajax:
+            headers["X-Requested-With"] = "XMLHttpRequest"
+        body = None
+        if data is not None:
+            headers["X-CSRFToken"] = self.csrf_token()
+            body = urllib.parse.urlencode({**data, "csrfmiddlewaretoken": self.csrf_token()}).encode()
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers)
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+    def login(self, username):
+        self.request(reverse("login"))
+        self.request(reverse("login"), {"username": username, "password": SEED_PASSWORD})
+        return any(c.name == "sessionid" for c in self.cookies)
+
+
+class Command(BaseCommand):
+    help = "Load-tests the hot endpoints of a running server and reports throughput and latency percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run.")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        users = list(
+            User.objects.filter(username__startswith="seed_user_")
+            .values_list("username", flat=True)[:options["concurrency"]]
+        )
+        if not users:
+            raise CommandError("No seed users found; run seed_scale first.")
+        # Target popular posts more often, as real traffic does.
+        self.post_ids = list(Post.objects.order_by("-trending_score").values_list("pk", flat=True)[:500])
+        self.comment_ids = list(
+            Comment.objects.filter(post_id__in=self.post_ids[:100], status="approved")
+            .values_list("pk", flat=True)[:2000]
+        )
+        if not self.post_ids or not self.comment_ids:
+            raise CommandError("No posts or comments to target; run seed_scale first.")
+
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+        deadline = time.monotonic() + options["duration"]
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            for i in range(options["concurrency"]):
+                pool.submit(
+                    self.worker, users[i % len(users)], options["base_url"], options["timeout"],
+                    deadline, random.Random(options["seed"] + i),
+                )
+        self.report(time.monotonic() - started)
+
+    def worker(self, username, base_url, timeout, deadline, rng):
+        client = Client(base_url, timeout)
+        if not client.login(username):
+            with self.lock:
+                self.errors["login"] += 1
+            return
+        names = [name for name, _ in SCENARIOS]
+        weights = [weight for _, weight in SCENARIOS]
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = getattr(self, f"hit_{name}")(client, rng)
+            except OSError:
+                status = 0
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.samples[name].append(elapsed)
+                if not 200 <= status < 400:
+                    self.errors[name] += 1
+
+    # --- Scenarios ---
+    def _post(self, rng):
+        return self.post_ids[min(int(rng.paretovariate(1.2)) - 1, len(self.post_ids) - 1)]
+
+    def hit_post_list(self, client, rng):
+        return client.request(reverse("post_list"))
+
+    def hit_post_detail(self, client, rng):
+        return client.request(reverse("post_detail", kwargs={"pk": self._post(rng)}))
+
+    def hit_sort_comments(self, client, rng):
+        url = reverse("sort_comments", kwargs={"pk": self._post(rng)})
+        return client.request(f"{url}?sort={rng.choice(('newest', 'oldest', 'top'))}", ajax=True)
+
+    def hit_comment_action(self, client, rng):
+        data = {"comment_id": rng.choice(self.comment_ids), "action": rng.choice(("upvote", "downvote"))}
+        return client.request(reverse("comment_action"), data, ajax=True)
+
+    def hit_add_comment(self, client, rng):
+        data = {"text": f"Load test comment {rng.randint(0, 10**9)} about pace and training."}
+        return client.request(reverse("add_comment", kwargs={"pk": self._post(rng)}), data, ajax=True)
+
+    def hit_notification_count(self, client, rng):
+        return client.request(reverse("get_notification_count"), ajax=True)
+
+    def hit_notification_html(self, client, rng):
+        return client.request(reverse("get_notifications_html"), ajax=True)
+
+    # --- Reporting ---
+    def report(self, elapsed):
+        total = sum(len(s) for s in self.samples.values())
+        self.stdout.write(f"{'endpoint':<20} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+        for name, _ in SCENARIOS:
+            samples = self.samples.get(name)
+            if not samples:
+                continue
+            self.stdout.write(
+                f"{name:<20} {len(samples):>9} {self.errors[name]:>7} {len(samples) / elapsed:>8.1f} "
+                f"{statistics.median(samples) * 1000:>8.1f} {percentile(samples, 90) * 1000:>8.1f} "
+                f"{percentile(samples, 99) * 1000:>8.1f}"
+            )
+        if self.errors["login"]:
+            self.stdout.write(self.style.WARNING(f"{self.errors['login']} workers failed to log in."))
+        self.stdout.write(self.style.SUCCESS(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)."))
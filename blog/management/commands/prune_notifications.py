@@ -0,0 +1,24 @@
+# File: blog/management/commands/prune_notifications.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.notifications import prune_read_notifications
+
+
+class Command(BaseCommand):
+    help = "Deletes read notifications older than the retention period."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+            help="Keep read notifications younger than this many days.",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows deleted per batch.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted = prune_read_notifications(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} read notification(s) older than {options['days']} day(s)."))
@@ -0,0 +1,16 @@
+# File: blog/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index for every post (FTS5 or posting lists)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Posts indexed per batch.")
+
+    def handle(self, *args, **options):
+        backend = "SQLite FTS5" if search.fts_available() else "posting lists"
+        count = search.rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} post(s) using {backend}."))
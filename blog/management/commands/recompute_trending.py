@@ -0,0 +1,18 @@
+# File: blog/management/commands/recompute_trending.py
+from django.core.management.base import BaseCommand
+
+from blog import trending
+
+
+class Command(BaseCommand):
+    help = "Re-applies the time decay to every post's trending score. Run periodically (e.g. every 15 minutes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild-engagement', action='store_true',
+            help="Also recount views, approved comments and votes instead of trusting the running totals.",
+        )
+
+    def handle(self, *args, **options):
+        count = trending.recompute(rebuild_engagement=options['rebuild_engagement'])
+        self.stdout.write(self.style.SUCCESS(f"Recomputed trending scores for {count} post(s)."))
@@ -0,0 +1,12 @@
+# File: blog/management/commands/reconcile_dashboard_stats.py
+from django.core.management.base import BaseCommand
+
+from blog.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recounts the materialized admin dashboard statistics from their source tables."
+
+    def handle(self, *args, **options):
+        drifted = reconcile()
+        self.stdout.write(self.style.SUCCESS(f"Corrected {drifted} statistic(s)."))
@@ -0,0 +1,12 @@
+# File: blog/management/commands/reconcile_notification_counts.py
+from django.core.management.base import BaseCommand
+
+from blog.notifications import reconcile_unread_counts
+
+
+class Command(BaseCommand):
+    help = "Recounts every profile's unread notification counter from the notifications table."
+
+    def handle(self, *args, **options):
+        fixed = reconcile_unread_counts()
+        self.stdout.write(self.style.SUCCESS(f"Corrected {fixed} profile(s)."))
@@ -0,0 +1,12 @@
+# File: blog/management/commands/reconcile_profile_counters.py
+from django.core.management.base import BaseCommand
+
+from blog.profiles import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recounts every profile's post, comment and vote totals from their source tables."
+
+    def handle(self, *args, **options):
+        fixed = reconcile()
+        self.stdout.write(self.style.SUCCESS(f"Corrected {fixed} profile(s)."))
@@ -0,0 +1,231 @@
+# File: blog/management/commands/seed_scale.py
+"""
+Generates a large synthetic dataset for load and query-plan testing.
+
+Popularity is skewed with a Zipf-like distribution (``--skew``): a few authors
+write most posts, and a few posts attract most comments, votes and reports.
+Rows are written with bulk_create in large batches inside one transaction
+with foreign-key checks deferred to commit. Primary keys are assigned up front
+so comment paths can be built before the rows are inserted.
+"""
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from blog import profiles, stats, trending
+from blog.models import MAX_THREAD_DEPTH, PATH_SEGMENT_WIDTH, Comment, Genre, Notification, Post, Profile
+from blog.notifications import reconcile_unread_counts
+
+
+WORDS = (
+    "the a of to and in running training pace shoes marathon trail recipe garlic basil oven travel city "
+    "train museum budget code python django database index query cache book chapter author story garden "
+    "tomato season camera lens light photo music album guitar concert movie scene review great really "
+    "think agree disagree interesting thanks helpful question answer experience week morning plan idea"
+).split()
+SEED_PASSWORD = "seed-password"
+
+
+def sentence(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+
+def zipf_weights(n, skew):
+    """Cumulative weights where item i is picked proportionally to 1 / (i + 1) ** skew."""
+    return list(itertools.accumulate(1 / (i + 1) ** skew for i in range(n)))
+
+
+def next_id(model):
+    return (model.objects.aggregate(m=Max("pk"))["m"] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = "Bulk-generates users, genres, posts, threaded comments, votes, reports and notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--genres", type=int, default=12)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument("--comments", type=int, default=100000)
+        parser.add_argument("--reply-ratio", type=float, default=0.6, help="Share of comments that are replies.")
+        parser.add_argument("--votes", type=float, default=3.0, help="Average votes per comment.")
+        parser.add_argument("--report-ratio", type=float, default=0.01, help="Share of comments with reports.")
+        parser.add_argument("--notifications", type=int, default=50000)
+        parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for author/post popularity.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+
+        with transaction.atomic():
+            self.defer_constraints()
+            users = self.create_users(options["users"])
+            genres = self.create_genres(options["genres"])
+            posts = self.create_posts(options["posts"], users, genres, options["skew"])
+            comments = self.create_comments(options["comments"], posts, users, options)
+            self.create_notifications(options["notifications"], users, comments, options["skew"])
+
+        self.refresh_derived_data()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(posts)} posts, {options['comments']} comments. "
+            f"Seed users log in with password '{SEED_PASSWORD}'. Run rebuild_search_index and "
+            f"build_related_posts to index the new posts."
+        ))
+
+    # --- Helpers ---
+    def defer_constraints(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute("PRAGMA defer_foreign_keys = ON")
+            elif connection.vendor == "postgresql":
+                cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+    def bulk(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def reset_sequences(self, *models):
+        statements = connection.ops.sequence_reset_sql(self.style, models)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def pick(self, items, cum_weights, k):
+        return self.rng.choices(items, cum_weights=cum_weights, k=k)
+
+    # --- Generators ---
+    def create_users(self, count):
+        password = make_password(SEED_PASSWORD)
+        first = next_id(User)
+        users = [
+            User(pk=first + i, username=f"seed_user_{first + i}", password=password, date_joined=self.now)
+            for i in range(count)
+        ]
+        self.bulk(User, users)
+        self.bulk(Profile, [Profile(user_id=user.pk) for user in users])
+        self.reset_sequences(User, Profile)
+        self.stdout.write(f"  users: {count}")
+        return [user.pk for user in users]
+
+    def create_genres(self, count):
+        first = next_id(Genre)
+        genres = [Genre(pk=first + i, name=f"Seed genre {first + i}") for i in range(count)]
+        self.bulk(Genre, genres)
+        self.reset_sequences(Genre)
+        return [genre.pk for genre in genres]
+
+    def create_posts(self, count, users, genres, skew):
+        first = next_id(Post)
+        authors = self.pick(users, zipf_weights(len(users), skew), count)
+        posts = []
+        for i, author_id in enumerate(authors):
+            post = Post(
+                pk=first + i,
+                title=sentence(self.rng, 3, 8)[:-1],
+                content="".join(f"<p>{sentence(self.rng, 20, 60)}</p>" for _ in range(self.rng.randint(2, 8))),
+                author_id=author_id,
+                genre_id=self.rng.choice(genres),
+                created_at=self.now - timedelta(minutes=self.rng.randint(0, 60 * 24 * 365)),
+                view_count=self.rng.randint(0, 5000),
+            )
+            post.refresh_reading_metadata()
+            posts.append(post)
+        self.bulk(Post, posts)
+        self.reset_sequences(Post)
+        self.stdout.write(f"  posts: {count}")
+        return [post.pk for post in posts]
+
+    def create_comments(self, count, posts, users, options):
+        post_weights = zipf_weights(len(posts), options["skew"])
+        statuses, status_weights = ("approved", "pending_review", "hidden", "rejected"), (90, 5, 3, 2)
+        next_pk = next_id(Comment)
+        # Recent comments per post that replies can attach to: (pk, path, created_at).
+        threads = {}
+        created_comments = []
+        up_rows, down_rows, report_rows = [], [], []
+        Up, Down, Report = Comment.upvotes.through, Comment.downvotes.through, Comment.reported_by.through
+
+        created = 0
+        while created < count:
+            batch = []
+            for post_id in self.pick(posts, post_weights, min(self.batch_size, count - created)):
+                pk, parent = next_pk, None
+                next_pk += 1
+                candidates = threads.get(post_id)
+                if candidates and self.rng.random() < options["reply_ratio"]:
+                    parent = self.rng.choice(candidates)
+                    if len(parent[1]) // PATH_SEGMENT_WIDTH >= MAX_THREAD_DEPTH:
+                        parent = None
+                path = (parent[1] if parent else "") + f"{pk:0{PATH_SEGMENT_WIDTH}x}"
+                created_at = (parent[2] if parent else self.now - timedelta(days=self.rng.randint(0, 365)))
+                created_at += timedelta(seconds=self.rng.randint(1, 86400))
+
+                voters = self.rng.sample(users, min(len(users), int(self.rng.expovariate(1 / options["votes"]))))
+                split = self.rng.randint(0, len(voters))
+                up, down = voters[:split], voters[split:]
+                up_rows.extend(Up(comment_id=pk, user_id=u) for u in up)
+                down_rows.extend(Down(comment_id=pk, user_id=u) for u in down)
+                reporters = []
+                if self.rng.random() < options["report_ratio"]:
+                    reporters = self.rng.sample(users, min(len(users), self.rng.randint(1, 4)))
+                    report_rows.extend(Report(comment_id=pk, user_id=u) for u in reporters)
+
+                batch.append(Comment(
+                    pk=pk, post_id=post_id, author_id=self.rng.choice(users), text=sentence(self.rng, 5, 40),
+                    parent_id=parent[0] if parent else None, path=path, created_at=created_at,
+                    status=self.rng.choices(statuses, weights=status_weights)[0], score=len(up) - len(down),
+                    report_count=len(reporters),
+                ))
+                recent = threads.setdefault(post_id, [])
+                recent.append((pk, path, created_at))
+                del recent[:-50]
+
+            self.bulk(Comment, batch)
+            created_comments.extend((comment.pk, comment.post_id) for comment in batch)
+            for model, rows in ((Up, up_rows), (Down, down_rows), (Report, report_rows)):
+                self.bulk(model, rows)
+                rows.clear()
+            created += len(batch)
+            self.stdout.write(f"  comments: {created}/{count}")
+        self.reset_sequences(Comment)
+        return created_comments
+
+    def create_notifications(self, count, users, comments, skew):
+        weights = zipf_weights(len(users), skew)
+        types = [t for t, _ in Notification.NOTIFICATION_TYPES if t != "toxic_comment"]
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            self.bulk(Notification, [
+                Notification(
+                    user_id=user_id,
+                    comment_id=comment_id,
+                    post_id=post_id,
+                    notification_type=self.rng.choice(types),
+                    message=sentence(self.rng, 6, 14),
+                    read=self.rng.random() < 0.8,
+                    created_at=self.now - timedelta(minutes=self.rng.randint(0, 60 * 24 * 90)),
+                )
+                for user_id, (comment_id, post_id) in zip(
+                    self.pick(users, weights, size), self.rng.choices(comments, k=size)
+                )
+            ])
+        self.stdout.write(f"  notifications: {count}")
+
+    def refresh_derived_data(self):
+        """Counters normally kept by signals, which bulk_create skips."""
+        post_counts = Post.objects.filter(genre=OuterRef("pk")).order_by().values("genre").annotate(n=Count("pk"))
+        Genre.objects.update(post_count=Coalesce(Subquery(post_counts.values("n")), 0))
+        reconcile_unread_counts()
+        stats.reconcile()
+        profiles.reconcile()
+        trending.recompute(rebuild_engagement=True)
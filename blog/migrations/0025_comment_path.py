@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:40
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Comment = apps.get_model("blog", "Comment")
+    parents = dict(Comment.objects.values_list("pk", "parent_id"))
+    paths = {}
+
+    def path_for(pk):
+        if pk not in paths:
+            parent_id = parents[pk]
+            prefix = path_for(parent_id) if parent_id in parents else ""
+            paths[pk] = f"{prefix}{pk:08x}"
+        return paths[pk]
+
+    for pk in parents:
+        Comment.objects.filter(pk=pk).update(path=path_for(pk))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0024_alter_profile_image"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.CharField(blank=True, default="", editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["post", "path"], name="comment_post_path_idx"),
+        ),
+    ]
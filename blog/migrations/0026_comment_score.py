@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:41
+
+from django.db import migrations, models
+
+
+def backfill_scores(apps, schema_editor):
+    Comment = apps.get_model("blog", "Comment")
+    comments = Comment.objects.annotate(
+        up=models.Count("upvotes", distinct=True),
+        down=models.Count("downvotes", distinct=True),
+    )
+    for pk, up, down in comments.values_list("pk", "up", "down"):
+        if up or down:
+            Comment.objects.filter(pk=pk).update(score=up - down)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0025_comment_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="score",
+            field=models.IntegerField(
+                default=0, editable=False, help_text="Upvotes minus downvotes."
+            ),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "parent", "created_at", "id"],
+                name="comment_thread_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "parent", "score", "id"],
+                name="comment_thread_top_idx",
+            ),
+        ),
+    ]
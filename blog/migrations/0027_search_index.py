@@ -0,0 +1,135 @@
+# Generated by Django 5.2.4 on 2026-10-19 05:45
+
+import html
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models
+from django.utils.html import strip_tags
+
+# Frozen copies of blog.search's indexing rules, so the migration does not
+# change when the app code does.
+TITLE_WEIGHT = 5
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def create_fts_table(apps, schema_editor):
+    # SQLite builds with FTS5 get a virtual table; everything else falls back
+    # to the SearchDocument/SearchPosting tables below.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts "
+            "USING fts5(title, body, tokenize='unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        pass
+
+
+def _plain_text(content):
+    return " ".join(html.unescape(strip_tags(content or "")).split())
+
+
+def populate_search_index(apps, schema_editor):
+    """Indexes the existing posts, so search works right after migrate."""
+    Post = apps.get_model("blog", "Post")
+    posts = Post.objects.only("pk", "title", "content").order_by("pk").iterator(chunk_size=500)
+    connection = schema_editor.connection
+
+    if connection.vendor == "sqlite" and "blog_post_fts" in connection.introspection.table_names():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO blog_post_fts (rowid, title, body) VALUES (%s, %s, %s)",
+                ((post.pk, _plain_text(post.title), _plain_text(post.content)) for post in posts),
+            )
+        return
+
+    SearchDocument = apps.get_model("blog", "SearchDocument")
+    SearchPosting = apps.get_model("blog", "SearchPosting")
+    for post in posts:
+        title, body = _plain_text(post.title), _plain_text(post.content)
+        terms = Counter()
+        for term in TOKEN_RE.findall(title.lower()):
+            terms[term] += TITLE_WEIGHT
+        terms.update(TOKEN_RE.findall(body.lower()))
+        terms = {term: freq for term, freq in terms.items() if len(term) <= 64}
+        document = SearchDocument.objects.create(post=post, title=title, body=body, length=sum(terms.values()))
+        SearchPosting.objects.bulk_create(
+            [SearchPosting(term=term, document=document, frequency=freq) for term, freq in terms.items()]
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS blog_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0026_comment_score"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="blog.post",
+                    ),
+                ),
+                ("title", models.TextField()),
+                (
+                    "body",
+                    models.TextField(help_text="Post content with the HTML stripped."),
+                ),
+                (
+                    "length",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Weighted number of indexed terms."
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SearchPosting",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                ("frequency", models.PositiveIntegerField()),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="postings",
+                        to="blog.searchdocument",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("term", "document"), name="unique_search_posting"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:12
+
+from django.db import migrations, models
+
+
+def backfill_unread_counts(apps, schema_editor):
+    Notification = apps.get_model("blog", "Notification")
+    Profile = apps.get_model("blog", "Profile")
+    counts = (
+        Notification.objects.filter(read=False)
+        .values_list("user_id")
+        .annotate(n=models.Count("pk"))
+    )
+    for user_id, n in counts:
+        Profile.objects.filter(user_id=user_id).update(unread_notifications=n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0027_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="unread_notifications",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, help_text="Maintained by blog.notifications."
+            ),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_posts(apps, schema_editor):
+    Notification = apps.get_model("blog", "Notification")
+    Comment = apps.get_model("blog", "Comment")
+    post_ids = dict(Comment.objects.values_list("pk", "post_id"))
+    for pk, comment_id in Notification.objects.filter(comment__isnull=False).values_list("pk", "comment_id"):
+        Notification.objects.filter(pk=pk).update(post_id=post_ids.get(comment_id))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0028_profile_unread_notifications"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="post",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Post the notification is about; used to merge repeated events.",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="blog.post",
+            ),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="count",
+            field=models.PositiveIntegerField(
+                default=1, help_text="Number of events merged into this notification."
+            ),
+        ),
+        migrations.RunPython(backfill_posts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "read", "created_at"], name="notification_user_read_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:05
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Weights and gravity as in blog.trending at the time of this migration.
+GRAVITY = 1.8
+VIEW_POINTS, COMMENT_POINTS, VOTE_POINTS = 0.1, 3, 1
+
+
+def backfill_scores(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    now = timezone.now()
+    posts = Post.objects.annotate(
+        approved=models.Count(
+            "comments", filter=models.Q(comments__status="approved"), distinct=True
+        ),
+        up=models.Count("comments__upvotes", distinct=True),
+        down=models.Count("comments__downvotes", distinct=True),
+    )
+    for post in posts:
+        engagement = (
+            post.view_count * VIEW_POINTS
+            + post.approved * COMMENT_POINTS
+            + (post.up + post.down) * VOTE_POINTS
+        )
+        age_hours = max((now - post.created_at).total_seconds() / 3600, 0)
+        Post.objects.filter(pk=post.pk).update(
+            engagement=engagement,
+            trending_score=engagement / (age_hours + 2) ** GRAVITY,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0029_notification_coalescing"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="engagement",
+            field=models.FloatField(
+                default=0, editable=False, help_text="Weighted views, comments and votes."
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="trending_score",
+            field=models.FloatField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
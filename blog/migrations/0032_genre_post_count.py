@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:55
+
+from django.db import migrations, models
+
+
+def backfill_post_counts(apps, schema_editor):
+    Genre = apps.get_model("blog", "Genre")
+    for genre in Genre.objects.annotate(n=models.Count("post")):
+        Genre.objects.filter(pk=genre.pk).update(post_count=genre.n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0031_relatedpost"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="genre",
+            name="post_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, help_text="Maintained by signals."
+            ),
+        ),
+        migrations.RunPython(backfill_post_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["genre", "created_at", "id"], name="post_genre_recent_idx"
+            ),
+        ),
+    ]
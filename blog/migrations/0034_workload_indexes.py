@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0033_post_reading_metadata"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["status", "created_at"], name="comment_status_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["author", "status", "created_at"], name="comment_author_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(fields=["user", "created_at"], name="notification_user_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["created_at", "id"], name="post_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["author", "created_at"], name="post_author_recent_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(condition=models.Q(("is_featured", True)), fields=["is_featured"], name="post_featured_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="profile",
+            index=models.Index(fields=["comment_ban_until"], name="profile_ban_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="userinquiry",
+            index=models.Index(fields=["status", "submitted_at"], name="inquiry_status_idx"),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+
+def backfill_dashboard_stats(apps, schema_editor):
+    Comment = apps.get_model("blog", "Comment")
+    DashboardStat = apps.get_model("blog", "DashboardStat")
+    Post = apps.get_model("blog", "Post")
+    User = apps.get_model("auth", "User")
+    UserInquiry = apps.get_model("blog", "UserInquiry")
+    counts = {
+        "total_posts": Post.objects.count(),
+        "total_comments": Comment.objects.count(),
+        "total_users": User.objects.count(),
+        "posts_with_photos": Post.objects.exclude(photo="").exclude(photo__isnull=True).count(),
+        "comments_to_moderate": Comment.objects.filter(status__in=("pending_review", "hidden")).count(),
+        "new_inquiries": UserInquiry.objects.filter(status="new").count(),
+    }
+    DashboardStat.objects.bulk_create(DashboardStat(key=key, value=value) for key, value in counts.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("blog", "0034_workload_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DashboardStat",
+            fields=[
+                ("key", models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ("value", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_dashboard_stats, migrations.RunPython.noop),
+    ]
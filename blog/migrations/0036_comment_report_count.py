@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+def backfill_report_counts(apps, schema_editor):
+    Comment = apps.get_model("blog", "Comment")
+    Reports = Comment.reported_by.through
+    counts = (
+        Reports.objects.values_list("comment_id")
+        .annotate(n=models.Count("pk"))
+    )
+    for comment_id, n in counts:
+        Comment.objects.filter(pk=comment_id).update(report_count=n)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0035_dashboardstat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="report_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, help_text="Number of users who reported it."
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                models.F("status"),
+                models.OrderBy(models.F("report_count"), descending=True),
+                models.F("created_at"),
+                models.F("id"),
+                name="comment_moderation_queue_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_report_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_profiles(apps, schema_editor):
+    """Creates the profiles of users who never got one, then fills the counters."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Profile = apps.get_model("blog", "Profile")
+    Post = apps.get_model("blog", "Post")
+    Comment = apps.get_model("blog", "Comment")
+
+    Profile.objects.bulk_create(
+        [Profile(user_id=pk) for pk in User.objects.filter(profile__isnull=True).values_list("pk", flat=True)],
+        batch_size=1000,
+    )
+
+    def per_author(queryset, aggregate):
+        return Coalesce(
+            models.Subquery(
+                queryset.filter(author_id=models.OuterRef("user_id")).order_by().values("author_id")
+                .annotate(n=aggregate).values("n"),
+                output_field=models.IntegerField(),
+            ),
+            0,
+        )
+
+    Profile.objects.update(
+        post_count=per_author(Post.objects.all(), models.Count("pk")),
+        comment_count=per_author(Comment.objects.filter(status="approved"), models.Count("pk")),
+        vote_total=per_author(Comment.objects.all(), models.Sum("score")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0037_comment_author_history_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="post_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Approved comments."),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="vote_total",
+            field=models.IntegerField(default=0, editable=False, help_text="Net score of the user's comments."),
+        ),
+        migrations.RunPython(backfill_profiles, migrations.RunPython.noop),
+    ]
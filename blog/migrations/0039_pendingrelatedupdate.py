@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0038_profile_summary_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingRelatedUpdate",
+            fields=[
+                ("post", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="+", serialize=False, to="blog.post")),
+                ("queued_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0039_pendingrelatedupdate"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(condition=models.Q(("read", True)), fields=["created_at"], name="notification_read_age_idx"),
+        ),
+    ]
@@ -1,11 +1,22 @@
 # File: blog/models.py
-from django.db import models
+import html
+import math
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.signals import post_save
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.html import strip_tags
 from ckeditor.fields import RichTextField
 
 
+def plain_text(content):
+    """Post HTML reduced to whitespace-normalised text."""
+    return ' '.join(html.unescape(strip_tags(content or '')).split())
+
+
 # ------------------ Profile ------------------
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -20,6 +31,20 @@ class Profile(models.Model):
     twitter_handle = models.CharField(max_length=15, blank=True)
     github_username = models.CharField(max_length=40, blank=True)
 
+    unread_notifications = models.PositiveIntegerField(
+        default=0, editable=False, help_text="Maintained by blog.notifications."
+    )
+
+    # Summary counters for the profile page, maintained by blog.profiles.
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False, help_text="Approved comments.")
+    vote_total = models.IntegerField(default=0, editable=False, help_text="Net score of the user's comments.")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['comment_ban_until'], name='profile_ban_idx'),
+        ]
+
     def __str__(self):
         return f'{self.user.username} Profile'
 
@@ -31,6 +56,7 @@ class Profile(models.Model):
 # ------------------ Genre ------------------
 class Genre(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    post_count = models.PositiveIntegerField(default=0, editable=False, help_text="Maintained by signals.")
 
     def __str__(self):
         return self.name
@@ -52,12 +78,19 @@ class UserInquiry(models.Model):
 
     class Meta:
         ordering = ['-submitted_at']
+        indexes = [
+            models.Index(fields=['status', 'submitted_at'], name='inquiry_status_idx'),
+        ]
 
     def __str__(self):
         return f"Inquiry from {self.name} ({self.status})"
 
 
 # ------------------ Post ------------------
+EXCERPT_WORDS = 30
+WORDS_PER_MINUTE = 200
+
+
 class Post(models.Model):
     title = models.CharField(max_length=200)
     genre = models.ForeignKey("Genre", on_delete=models.SET_NULL, null=True, blank=True)
@@ -70,8 +103,24 @@ class Post(models.Model):
     view_count = models.PositiveIntegerField(default=0, help_text="Automatically updated.")
     is_featured = models.BooleanField(default=False, help_text="Only one post can be featured at a time.")
 
+    # Derived from content on save; listings render these instead of the body.
+    excerpt = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False, help_text="Minutes.")
+
+    # Maintained by blog.trending.
+    engagement = models.FloatField(default=0, editable=False, help_text="Weighted views, comments and votes.")
+    trending_score = models.FloatField(default=0, editable=False, db_index=True)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['genre', 'created_at', 'id'], name='post_genre_recent_idx'),
+            models.Index(fields=['created_at', 'id'], name='post_recent_idx'),
+            models.Index(fields=['author', 'created_at'], name='post_author_recent_idx'),
+            # Only the (at most one) featured post is indexed.
+            models.Index(fields=['is_featured'], name='post_featured_idx', condition=models.Q(is_featured=True)),
+        ]
 
     def __str__(self):
         return self.title
@@ -82,10 +131,29 @@ class Post(models.Model):
     def save(self, *args, **kwargs):
         if self.is_featured:
             Post.objects.filter(is_featured=True).exclude(pk=self.pk).update(is_featured=False)
+        update_fields = kwargs.get('update_fields')
+        if 'content' not in self.get_deferred_fields() and (update_fields is None or 'content' in update_fields):
+            self.refresh_reading_metadata()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'excerpt', 'word_count', 'reading_time'}
         super().save(*args, **kwargs)
 
+    def refresh_reading_metadata(self):
+        """Fills excerpt, word_count and reading_time from the current content."""
+        words = plain_text(self.content).split()
+        self.word_count = len(words)
+        self.reading_time = max(1, math.ceil(len(words) / WORDS_PER_MINUTE))
+        self.excerpt = ' '.join(words[:EXCERPT_WORDS]) + (' …' if len(words) > EXCERPT_WORDS else '')
+
 
 # ------------------ Comment ------------------
+# Each comment stores a materialized path: the zero-padded hex ids of all of its
+# ancestors followed by its own id. Ordering by path yields a depth-first walk of
+# the thread, so a whole discussion can be read with one indexed range query.
+PATH_SEGMENT_WIDTH = 8
+MAX_THREAD_DEPTH = 30
+
+
 class Comment(models.Model):
     STATUS_CHOICES = (
         ('approved', 'Approved'),
@@ -105,25 +173,93 @@ class Comment(models.Model):
     toxicity_label = models.CharField(max_length=50, null=True, blank=True)
     is_edited = models.BooleanField(default=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='approved')
+    path = models.CharField(max_length=255, blank=True, default='', editable=False)
+    score = models.IntegerField(default=0, editable=False, help_text="Upvotes minus downvotes.")
+    report_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of users who reported it.")
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+            models.Index(fields=['post', 'parent', 'created_at', 'id'], name='comment_thread_recent_idx'),
+            models.Index(fields=['post', 'parent', 'score', 'id'], name='comment_thread_top_idx'),
+            models.Index(fields=['status', 'created_at'], name='comment_status_recent_idx'),
+            models.Index(fields=['author', 'status', 'created_at'], name='comment_author_recent_idx'),
+            models.Index(fields=['author', 'created_at'], name='comment_author_history_idx'),
+            # The moderation queue (see blog.moderation) reads this index in order, one status at a time.
+            models.Index(
+                'status', F('report_count').desc(), 'created_at', 'id', name='comment_moderation_queue_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author} on {self.post.title}"
 
+    @property
+    def depth(self):
+        """0 for top-level comments, 1 for direct replies, and so on."""
+        return max(len(self.path) // PATH_SEGMENT_WIDTH - 1, 0)
+
+    def save(self, *args, **kwargs):
+        # Replies beyond the maximum depth are attached to their grandparent so
+        # the path always fits in the column.
+        if self.parent_id and self.parent.depth >= MAX_THREAD_DEPTH - 1:
+            self.parent = self.parent.parent
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Votes and reports move score and report_count with UPDATEs; an
+            # instance loaded before them must not write the old values back.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('score', 'report_count')
+            ]
+        # The path is built from the pk, so assign_comment_path fills it in
+        # right after the insert, in the same transaction.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def get_vote_score(self):
         return self.upvotes.count() - self.downvotes.count()
 
     def add_report(self, user):
-        if not self.reported_by.filter(id=user.id).exists():
-            self.reported_by.add(user)
-        if self.reported_by.count() >= 3 and self.status == 'approved':
-            self.status = 'hidden'
-            self.save(update_fields=['status'])
+        from .moderation import report  # moderation imports this module
+        report(self, user)
         return "reported"
 
 
+def assign_comment_path(sender, instance, raw, **kwargs):
+    """
+    Gives a new comment its path once the insert has assigned its pk. It is
+    connected here, before the receivers in blog.signals, so every post_save
+    receiver sees the final path. Fixture rows without a path get one too.
+    """
+    if instance.path:
+        return
+    if not raw:
+        prefix = instance.parent.path if instance.parent_id else ''
+    elif instance.parent_id:
+        # A fixture may list a reply before its parent; it gets its path when the parent is loaded.
+        prefix = Comment.objects.filter(pk=instance.parent_id).values_list('path', flat=True).first()
+        if not prefix:
+            return
+    else:
+        prefix = ''
+    instance.path = f"{prefix}{instance.pk:0{PATH_SEGMENT_WIDTH}x}"
+    Comment.objects.filter(pk=instance.pk).update(path=instance.path)
+    if raw:
+        _fill_reply_paths(instance.pk, instance.path)
+
+
+def _fill_reply_paths(comment_id, path):
+    """Paths for the replies loaded before ``comment_id`` had its own, and for theirs."""
+    for reply_id in Comment.objects.filter(parent_id=comment_id, path='').values_list('pk', flat=True):
+        reply_path = f"{path}{reply_id:0{PATH_SEGMENT_WIDTH}x}"
+        Comment.objects.filter(pk=reply_id).update(path=reply_path)
+        _fill_reply_paths(reply_id, reply_path)
+
+
+post_save.connect(assign_comment_path, sender=Comment)
+
+
 # ------------------ Notification ------------------
 class Notification(models.Model):
     NOTIFICATION_TYPES = (
@@ -139,14 +275,78 @@ class Notification(models.Model):
     read = models.BooleanField(default=False)
     comment = models.ForeignKey(Comment, on_delete=models.CASCADE, null=True, blank=True)
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES, default='new_comment')
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, null=True, blank=True, related_name='+',
+        help_text="Post the notification is about; used to merge repeated events.",
+    )
+    count = models.PositiveIntegerField(default=1, help_text="Number of events merged into this notification.")
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'read', 'created_at'], name='notification_user_read_idx'),
+            models.Index(fields=['user', 'created_at'], name='notification_user_recent_idx'),
+            # Retention (blog.notifications.prune_read_notifications) reads old read rows by age.
+            models.Index(fields=['created_at'], name='notification_read_age_idx', condition=models.Q(read=True)),
+        ]
 
     def __str__(self):
         return f"Notification for {self.user.username}: {self.get_notification_type_display()}"
 
 
+# ------------------ Related Posts ------------------
+# Top neighbours of each post by TF-IDF similarity, maintained by blog.related.
+class RelatedPost(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['post', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'rank'], name='unique_related_post_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} -> {self.related_id} ({self.score:.3f})"
+
+
+class PendingRelatedUpdate(models.Model):
+    """A post whose related lists must be recomputed by ``build_related_posts --pending``."""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    queued_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Related posts of {self.post_id} queued at {self.queued_at}"
+
+
+# ------------------ Search Index ------------------
+# Posting-list index used by blog.search when SQLite FTS5 is not available.
+class SearchDocument(models.Model):
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    title = models.TextField()
+    body = models.TextField(help_text="Post content with the HTML stripped.")
+    length = models.PositiveIntegerField(default=0, help_text="Weighted number of indexed terms.")
+
+    def __str__(self):
+        return f"Search document for post {self.post_id}"
+
+
+class SearchPosting(models.Model):
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'document'], name='unique_search_posting'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.document_id}"
+
+
 # ------------------ Site Settings ------------------
 class SiteSettings(models.Model):
     site_name = models.CharField(max_length=100, default="Sanity Check")
@@ -158,3 +358,13 @@ class SiteSettings(models.Model):
 
     def __str__(self):
         return "Site Settings"
+
+
+# ------------------ Dashboard statistics ------------------
+class DashboardStat(models.Model):
+    """One materialized admin dashboard counter; see blog/stats.py."""
+    key = models.CharField(max_length=40, primary_key=True)
+    value = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
@@ -0,0 +1,187 @@
+# File: blog/moderation.py
+"""
+The comment moderation queue and bulk moderation decisions.
+
+Reports are counted on the comment itself with one conditional UPDATE that
+also hides the comment once REPORTS_TO_HIDE users have reported it.
+
+The queue holds pending and hidden comments, most reported first and then
+oldest first. Every comment stores its ``report_count``, so a page is one
+ordered range read per status over ``comment_moderation_queue_idx``, merged
+here, with a keyset cursor and no COUNT. ``decide`` applies one decision to
+many comments with a single UPDATE or DELETE and one bulk_create of author
+notifications.
+"""
+import base64
+import binascii
+from collections import Counter
+from datetime import datetime
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, Q, Value, When
+
+from . import homepage, profiles, stats, trending
+from .models import Comment, Notification
+from .notifications import deliver
+from .realtime import broadcast_comment
+from .threads import bump_thread_version, forget_reported_comments
+
+
+REPORTS_TO_HIDE = 3
+QUEUE_PAGE_SIZE = 20
+MAX_DECISIONS = 500
+DECISIONS = ('approve', 'reject', 'delete')
+_QUEUE_ORDERING = ('-report_count', 'created_at', 'id')
+
+
+# ------------------ Reports ------------------
+def _count_report(comment_id):
+    """
+    Adds one report to the counter and hides an approved comment that reaches
+    REPORTS_TO_HIDE, in one statement. Returns the new ``(report_count, status)``.
+    """
+    if connection.features.can_return_columns_from_insert:
+        # Databases with RETURNING hand the new values back from the UPDATE itself.
+        table = connection.ops.quote_name(Comment._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET report_count = report_count + 1, "
+                f"status = CASE WHEN status = 'approved' AND report_count + 1 >= %s THEN 'hidden' ELSE status END "
+                f"WHERE id = %s RETURNING report_count, status",
+                [REPORTS_TO_HIDE, comment_id],
+            )
+            return cursor.fetchone()
+    Comment.objects.filter(pk=comment_id).update(
+        report_count=F('report_count') + 1,
+        status=Case(
+            When(status='approved', report_count__gte=REPORTS_TO_HIDE - 1, then=Value('hidden')),
+            default=F('status'),
+        ),
+    )
+    return Comment.objects.filter(pk=comment_id).values_list('report_count', 'status').get()
+
+
+def report(comment, user):
+    """
+    Records ``user``'s report of ``comment``; returns False if they had
+    already reported it. The report row is unique per user and the counter
+    moves inside the database, so parallel reporters can neither lose a count
+    nor slip past the threshold. ``comment.report_count`` and
+    ``comment.status`` are updated in place.
+    """
+    Reports = Comment.reported_by.through
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Reports.objects.create(comment_id=comment.pk, user_id=user.pk)
+        except IntegrityError:
+            return False
+        comment.report_count, comment.status = _count_report(comment.pk)
+        transaction.on_commit(lambda: forget_reported_comments(user))
+        if comment.status == 'hidden':
+            # The UPDATE skipped the model signals; hidden comments leave the
+            # cached threads and join the moderation queue.
+            stats.recount('comments_to_moderate')
+            profiles.recount([comment.author_id])
+            transaction.on_commit(lambda: bump_thread_version(comment.post_id))
+            transaction.on_commit(homepage.invalidate)
+    return True
+
+
+# ------------------ Queue ------------------
+def encode_cursor(comment):
+    raw = f"{comment.report_count}|{comment.created_at.isoformat()}|{comment.pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns ``(report_count, created_at, pk)`` or ``None`` for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        report_count, created_at, pk = raw.split('|')
+        return int(report_count), datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def queue_page(cursor=None, page_size=QUEUE_PAGE_SIZE):
+    """Returns ``(comments, next_cursor)``; ``next_cursor`` is ``None`` on the last page."""
+    comments = Comment.objects.select_related('author', 'post').defer('post__content')
+    after = decode_cursor(cursor)
+    if after:
+        report_count, created_at, pk = after
+        comments = comments.filter(
+            Q(report_count__lt=report_count)
+            | Q(report_count=report_count, created_at__gt=created_at)
+            | Q(report_count=report_count, created_at=created_at, id__gt=pk)
+        )
+    # A status IN (...) filter would make the database sort the whole queue;
+    # each status on its own is already in index order.
+    candidates = []
+    for status in stats.MODERATION_STATUSES:
+        candidates.extend(comments.filter(status=status).order_by(*_QUEUE_ORDERING)[:page_size + 1])
+    candidates.sort(key=lambda c: (-c.report_count, c.created_at, c.pk))
+    comments = candidates[:page_size + 1]
+    if len(comments) > page_size:
+        return comments[:page_size], encode_cursor(comments[page_size - 1])
+    return comments, None
+
+
+# ------------------ Decisions ------------------
+def decide(comments, decision):
+    """
+    Approves, rejects or deletes the ``comments`` queryset and returns how
+    many were changed. Approved authors get a ``comment_approved``
+    notification and approved comments are broadcast to the post's readers.
+    """
+    if decision not in DECISIONS:
+        raise ValueError(f"Unknown moderation decision: {decision}")
+
+    with transaction.atomic():
+        if decision == 'approve':
+            newly_approved = list(
+                comments.exclude(status='approved').select_related('post').only(
+                    'pk', 'author_id', 'post_id', 'post__title'
+                )
+            )
+            post_ids = {c.post_id for c in newly_approved}
+            author_ids = {c.author_id for c in newly_approved}
+            # Reports before the approval are settled; only new ones count towards hiding it again.
+            changed = comments.filter(pk__in=[c.pk for c in newly_approved]).update(status='approved', report_count=0)
+            for post_id, approved in Counter(c.post_id for c in newly_approved).items():
+                trending.record(post_id, approved * trending.COMMENT_POINTS)
+            deliver([
+                Notification(
+                    user_id=comment.author_id,
+                    notification_type='comment_approved',
+                    message=f"Your comment on '{comment.post.title}' has been approved by an admin.",
+                    comment_id=comment.pk,
+                    post_id=comment.post_id,
+                )
+                for comment in newly_approved
+            ])
+            # Readers of the posts see the comments appear, as with any new comment.
+            for comment in Comment.objects.filter(pk__in=[c.pk for c in newly_approved]).select_related(
+                'author__profile', 'post'
+            ):
+                broadcast_comment(comment)
+        elif decision == 'reject':
+            rejected = list(comments.exclude(status='rejected').values_list('post_id', 'author_id'))
+            post_ids = {post_id for post_id, _ in rejected}
+            author_ids = {author_id for _, author_id in rejected}
+            changed = comments.exclude(status='rejected').update(status='rejected')
+        else:
+            # Deletes send post_delete per comment, which moves the profile counters.
+            post_ids = set(comments.values_list('post_id', flat=True))
+            author_ids = ()
+            changed = comments.delete()[1].get(Comment._meta.label, 0)
+
+        # UPDATEs skip the model signals, so refresh what they would have.
+        stats.recount('comments_to_moderate')
+        profiles.recount(author_ids)
+        for post_id in post_ids:
+            transaction.on_commit(lambda post_id=post_id: bump_thread_version(post_id))
+        transaction.on_commit(homepage.invalidate)
+    return changed
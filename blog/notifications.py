@@ -0,0 +1,172 @@
+# File: blog/notifications.py
+"""
+Delivering notifications and keeping their unread counts.
+
+Comment and reply notifications about the same post are merged into the
+recipient's latest unread one while it is younger than
+NOTIFICATION_COALESCE_WINDOW, so a busy post produces one "N new comments"
+row instead of one row per comment; everything else is written with a single
+bulk_create. Merged rows move to the top and are pushed again like new ones.
+
+Every profile keeps an ``unread_notifications`` counter so the navbar badge,
+the count endpoint and the live push/poll paths read one row instead of
+counting the notifications table. The counter is moved with atomic UPDATEs:
+up when a notification is created (see signals), down when unread ones are
+deleted or marked read. ``manage.py reconcile_notification_counts`` recounts
+it from the notifications themselves.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CharField, Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat, Greatest
+from django.utils import timezone
+
+from .models import Notification, Profile
+
+
+# Messages for merged notifications, formatted with the event count and post title.
+COALESCED_MESSAGES = {
+    'new_comment': "{count} new comments on your post: '{title}'.",
+    'new_reply': "{count} new replies to your comments on '{title}'.",
+}
+
+
+def unread_count(user_id):
+    count = Profile.objects.filter(user_id=user_id).values_list('unread_notifications', flat=True).first()
+    return count or 0
+
+
+def adjust_unread_count(user_ids, delta):
+    """Moves the counter of one user (an id) or several (a list of ids) by ``delta``."""
+    if not isinstance(user_ids, (list, tuple, set)):
+        user_ids = [user_ids]
+    Profile.objects.filter(user_id__in=user_ids).update(
+        unread_notifications=Greatest(F('unread_notifications') + delta, Value(0))
+    )
+
+
+def mark_all_read(user):
+    """Marks every unread notification of ``user`` read; returns how many changed."""
+    with transaction.atomic():
+        marked = Notification.objects.filter(user=user, read=False).update(read=True)
+        if marked:
+            adjust_unread_count(user.pk, -marked)
+    return marked
+
+
+def reconcile_unread_counts():
+    """Recounts every profile's counter from its notifications; returns the rows fixed."""
+    actual = Subquery(
+        Notification.objects.filter(user_id=OuterRef('user_id'), read=False)
+        .values('user_id')
+        .annotate(n=Count('pk'))
+        .values('n'),
+        output_field=IntegerField(),
+    )
+    actual = Coalesce(actual, 0)
+    drifted = list(
+        Profile.objects.annotate(actual=actual).exclude(unread_notifications=F('actual')).values_list('pk', flat=True)
+    )
+    # The count is recomputed inside the UPDATE so concurrent changes are not lost.
+    return Profile.objects.filter(pk__in=drifted).update(unread_notifications=actual) if drifted else 0
+
+
+# ------------------ Delivery ------------------
+def _coalesced_message(notification_type, count, title):
+    """The merged message as an SQL expression of ``count``, so it always matches the stored count."""
+    before, _, after = COALESCED_MESSAGES[notification_type].partition('{count}')
+    return Concat(
+        Value(before.format(title=title)), Cast(count, CharField()), Value(after.format(title=title)),
+        output_field=CharField(),
+    )
+
+
+def _merge_into_existing(notification, since):
+    """
+    Folds ``notification`` into a recent unread one; returns the merged row or
+    None. The count is raised in the UPDATE itself, which stays correct under
+    concurrent comments (SQLite ignores SELECT ... FOR UPDATE).
+    """
+    candidate = (
+        Notification.objects.filter(
+            user_id=notification.user_id,
+            notification_type=notification.notification_type,
+            post_id=notification.post_id,
+            read=False,
+            created_at__gte=since,
+        )
+        .order_by('-created_at')
+        .values_list('pk', flat=True)
+        .first()
+    )
+    if candidate is None:
+        return None
+    count = F('count') + 1
+    merged = Notification.objects.filter(pk=candidate, read=False).update(
+        count=count,
+        message=_coalesced_message(notification.notification_type, count, notification.post.title),
+        comment=notification.comment,
+        created_at=notification.created_at,
+    )
+    # Read in the meantime: deliver it as a new notification instead.
+    if not merged:
+        return None
+    return Notification.objects.select_related('comment').get(pk=candidate)
+
+
+def deliver(notifications):
+    """
+    Saves unsaved Notification instances, merging comment and reply
+    notifications into recent unread ones where possible and inserting the
+    rest with one bulk_create. Returns the saved (new or merged) rows in the
+    order given.
+    """
+    from .realtime import push_notification  # realtime imports this module
+
+    since = timezone.now() - timedelta(seconds=settings.NOTIFICATION_COALESCE_WINDOW)
+    delivered, new, merged_rows = [], [], []
+    for notification in notifications:
+        if notification.post_id is None and notification.comment_id is not None:
+            notification.post_id = notification.comment.post_id
+        merged = None
+        if notification.notification_type in COALESCED_MESSAGES and notification.post_id is not None:
+            merged = _merge_into_existing(notification, since)
+        if merged is None:
+            new.append(notification)
+        else:
+            merged_rows.append(merged)
+        delivered.append(merged or notification)
+
+    if new:
+        with transaction.atomic():
+            Notification.objects.bulk_create(new)
+            # bulk_create skips post_save, so count and push the new rows here.
+            per_user = Counter(n.user_id for n in new if not n.read)
+            by_amount = defaultdict(list)
+            for user_id, added in per_user.items():
+                by_amount[added].append(user_id)
+            for added, user_ids in by_amount.items():
+                adjust_unread_count(user_ids, added)
+    # Merged rows are pushed too: their message and count changed in place.
+    for notification in new + merged_rows:
+        transaction.on_commit(lambda n=notification: push_notification(n))
+    return delivered
+
+
+# ------------------ Retention ------------------
+def prune_read_notifications(older_than, batch_size=1000):
+    """
+    Deletes read notifications created before ``older_than`` in batches of
+    ``batch_size``, walking the partial index of read notifications by age.
+    Returns the number deleted.
+    """
+    stale = Notification.objects.filter(read=True, created_at__lt=older_than)
+    deleted = 0
+    while True:
+        batch = list(stale.order_by().values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        deleted += Notification.objects.filter(pk__in=batch).delete()[1].get(Notification._meta.label, 0)
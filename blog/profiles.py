@@ -0,0 +1,65 @@
+# File: blog/profiles.py
+"""
+Summary counters for profile pages.
+
+Every profile keeps ``post_count``, ``comment_count`` (approved comments) and
+``vote_total`` (the net score of the user's comments), so a profile page
+reads them with the profile row instead of counting posts and comments. The
+counters are moved with atomic UPDATEs by signals and by the vote view; bulk
+status changes, which bypass signals, call ``recount`` for the authors they
+touched. ``manage.py reconcile_profile_counters`` recounts every profile.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Post, Profile
+
+
+COUNTERS = ('post_count', 'comment_count', 'vote_total')
+
+
+def adjust(user_id, **deltas):
+    """Moves the named counters of one user, e.g. ``adjust(5, comment_count=-1)``."""
+    deltas = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if user_id and deltas:
+        Profile.objects.filter(user_id=user_id).update(**deltas)
+
+
+def _actual():
+    """The source of truth for every counter, as subqueries on a profile's user."""
+    def per_author(queryset, aggregate):
+        return Coalesce(
+            Subquery(
+                queryset.filter(author_id=OuterRef('user_id')).order_by().values('author_id')
+                .annotate(n=aggregate).values('n'),
+                output_field=IntegerField(),
+            ),
+            0,
+        )
+    return {
+        'post_count': per_author(Post.objects.all(), Count('pk')),
+        'comment_count': per_author(Comment.objects.filter(status='approved'), Count('pk')),
+        'vote_total': per_author(Comment.objects.all(), Sum('score')),
+    }
+
+
+def recount(user_ids):
+    """Recomputes the counters of the given users in one UPDATE."""
+    user_ids = {pk for pk in user_ids if pk}
+    if user_ids:
+        Profile.objects.filter(user_id__in=user_ids).update(**_actual())
+
+
+def reconcile():
+    """Recounts every profile's counters; returns the rows fixed."""
+    actual = _actual()
+    drifted = Q()
+    for field in COUNTERS:
+        drifted |= ~Q(**{field: F(f'actual_{field}')})
+    drifted = list(
+        Profile.objects.annotate(**{f'actual_{field}': value for field, value in actual.items()})
+        .filter(drifted)
+        .values_list('pk', flat=True)
+    )
+    # The counts are recomputed inside the UPDATE so concurrent changes are not lost.
+    return Profile.objects.filter(pk__in=drifted).update(**actual) if drifted else 0
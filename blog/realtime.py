@@ -0,0 +1,133 @@
+# File: blog/realtime.py
+"""
+Pushes live updates to connected browsers through the channel layer.
+
+Each logged-in user has a group that their WebSocket connections (and any
+pending long-poll request) join, and every post has a group for the readers
+currently viewing its discussion. With the in-memory layer configured in
+settings this works within a single process; point CHANNEL_LAYERS at Redis to
+fan out across several.
+"""
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from .models import Notification
+from .notifications import unread_count
+
+
+# Votes reach readers in one message per post per interval.
+VOTE_BATCH_INTERVAL = 2.0
+VOTE_SLOT_TIMEOUT = 60
+MAX_VOTE_BATCH = 1000
+
+def notification_group(user_id):
+    return f"notifications_{user_id}"
+
+
+def post_group(post_id):
+    return f"post_{post_id}"
+
+
+def notification_state(user_id):
+    """``(unread_count, etag)`` describing what the user's badge should show."""
+    count = unread_count(user_id)
+    # A merged notification keeps its id but moves to the top with a new count.
+    latest = Notification.objects.filter(user_id=user_id).order_by('-created_at').values_list('pk', 'count').first()
+    latest_id, merged = latest or (0, 0)
+    return count, f'"{count}-{latest_id}-{merged}"'
+
+
+def _group_send(group, message):
+    layer = get_channel_layer()
+    if layer is not None:
+        async_to_sync(layer.group_send)(group, message)
+
+
+def push_notification(notification):
+    """Sends a new or merged notification and the fresh unread count to its recipient."""
+    unread_count, etag = notification_state(notification.user_id)
+    html = render_to_string("blog/includes/notification_item.html", {"notification": notification})
+    _group_send(notification_group(notification.user_id), {
+        "type": "notification.push",
+        "id": notification.pk,
+        "html": html,
+        "unread_count": unread_count,
+        "etag": etag,
+    })
+
+
+def broadcast_comment(comment):
+    """
+    Sends a newly visible comment to everyone reading its post, once the
+    surrounding transaction commits. The fragment is rendered for an
+    anonymous reader; each browser reveals its own controls.
+    """
+    def send():
+        html = render_to_string("blog/includes/comment.html", {
+            "comment": comment,
+            "post": comment.post,
+            "thread_public": True,
+            "MEDIA_URL": settings.MEDIA_URL,
+        })
+        _group_send(post_group(comment.post_id), {
+            "type": "comment.new",
+            "id": comment.pk,
+            "parent_id": comment.parent_id,
+            "html": html,
+        })
+    transaction.on_commit(send)
+
+
+def _votes_key(post_id, suffix):
+    return f"live-votes:{post_id}:{suffix}"
+
+
+def broadcast_votes(comment, upvotes, downvotes):
+    """
+    Queues the latest vote counts of ``comment`` for its post's readers.
+    Each vote takes a numbered slot in the shared cache, so votes handled by
+    any process join the same batch; the first vote of an interval schedules
+    ``flush_votes``, which sends them all in one message.
+    """
+    post_id = comment.post_id
+    cache.add(_votes_key(post_id, 'seq'), 0, None)
+    seq = cache.incr(_votes_key(post_id, 'seq'))
+    cache.set(_votes_key(post_id, seq), (comment.pk, upvotes, downvotes), VOTE_SLOT_TIMEOUT)
+    if cache.add(_votes_key(post_id, 'flush'), True, VOTE_SLOT_TIMEOUT):
+        timer = threading.Timer(VOTE_BATCH_INTERVAL, flush_votes, [post_id])
+        timer.daemon = True
+        timer.start()
+
+
+def flush_votes(post_id):
+    """Sends the votes queued for a post since the last flush; later counts win."""
+    # Released first, so a vote arriving meanwhile schedules the next flush.
+    cache.delete(_votes_key(post_id, 'flush'))
+    last = cache.get(_votes_key(post_id, 'seq'), 0)
+    first = max(cache.get(_votes_key(post_id, 'sent'), 0), last - MAX_VOTE_BATCH) + 1
+    queued = cache.get_many([_votes_key(post_id, n) for n in range(first, last + 1)])
+    # A slot can be numbered but not yet written: stop before it, as its writer
+    # schedules the next flush. A slot still missing on that flush was lost.
+    lost = cache.get(_votes_key(post_id, 'gap'))
+    sent = first - 1
+    for n in range(first, last + 1):
+        if _votes_key(post_id, n) not in queued and n != lost:
+            cache.set(_votes_key(post_id, 'gap'), n, VOTE_SLOT_TIMEOUT)
+            break
+        sent = n
+    cache.set(_votes_key(post_id, 'sent'), sent, None)
+    slots = [_votes_key(post_id, n) for n in range(first, sent + 1)]
+    cache.delete_many(slots)
+    votes = {}
+    for slot in slots:
+        if slot in queued:
+            comment_id, upvotes, downvotes = queued[slot]
+            votes[comment_id] = [upvotes, downvotes]
+    if votes:
+        _group_send(post_group(post_id), {"type": "comment.votes", "votes": votes})
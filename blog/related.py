@@ -0,0 +1,233 @@
+# File: blog/related.py
+"""
+Precomputed "related posts".
+
+Every post is turned into a TF-IDF vector over its HTML-stripped content, its
+title (weighted up) and its genre. Vectors are L2-normalised and kept sparse
+(the columns and weights of the terms a post actually uses), next to an
+inverted index of the posts per term, so the cosine similarities of a batch of
+posts against all others only touch the terms they share. The top
+RELATED_POSTS neighbours of each post are stored in the RelatedPost table and
+post detail pages read their list with one indexed query.
+
+Nothing is computed on the request path. Saving or deleting a post queues the
+posts whose lists may change in PendingRelatedUpdate;
+``manage.py build_related_posts --pending`` (run every few minutes) recomputes
+only the lists those posts can affect, and ``manage.py build_related_posts``
+rebuilds everything and should run nightly.
+"""
+import math
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PendingRelatedUpdate, Post, RelatedPost
+from .search import plain_text, tokenize
+
+
+RELATED_POSTS = 5
+TITLE_WEIGHT = 3
+GENRE_WEIGHT = 2
+MAX_FEATURES = 4096
+BATCH_SIZE = 256
+# Ids per IN (...) list, below SQLite's bound-variable limit.
+ID_CHUNK_SIZE = 500
+# Terms in more than this share of posts carry no signal (applied once there
+# are enough posts for the share to mean something).
+MAX_DOCUMENT_SHARE = 0.5
+MIN_POSTS_FOR_SHARE = 50
+
+
+def _terms(post):
+    terms = Counter(tokenize(plain_text(post.content)))
+    for term in tokenize(plain_text(post.title)):
+        terms[term] += TITLE_WEIGHT
+    if post.genre_id:
+        terms[f'genre:{post.genre_id}'] += GENRE_WEIGHT
+    return terms
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        yield ids[start:start + ID_CHUNK_SIZE]
+
+
+class RelatedIndex:
+    """The sparse vectors of every post; built by ``fit`` for one job and then discarded."""
+
+    def __init__(self):
+        self.ids = []            # row -> post id
+        self.rows = {}           # post id -> row
+        self.vocabulary = {}     # term -> column
+        self.idf = None
+        self.vectors = []        # row -> (columns, weights), normalised
+        self.postings = {}       # column -> (rows, weights)
+
+    # --- Vectors ---
+    def _vector(self, terms):
+        columns, weights = [], []
+        for term, freq in terms.items():
+            column = self.vocabulary.get(term)
+            if column is not None:
+                columns.append(column)
+                weights.append((1 + math.log(freq)) * self.idf[column])
+        columns = np.array(columns, dtype=np.int32)
+        weights = np.array(weights, dtype=np.float32)
+        norm = np.linalg.norm(weights)
+        return columns, (weights / norm if norm else weights)
+
+    def fit(self):
+        """Builds the vocabulary, the vectors of every post and the inverted index."""
+        posts = Post.objects.only('pk', 'title', 'content', 'genre_id').order_by('pk')
+        documents = {post.pk: _terms(post) for post in posts.iterator(chunk_size=500)}
+
+        df = Counter()
+        for terms in documents.values():
+            df.update(terms.keys())
+        limit = len(documents)
+        if limit >= MIN_POSTS_FOR_SHARE:
+            limit = int(limit * MAX_DOCUMENT_SHARE)
+        candidates = [t for t, n in df.items() if 2 <= n <= limit] or list(df)
+        candidates.sort(key=lambda t: (-df[t], t))
+        self.vocabulary = {term: i for i, term in enumerate(candidates[:MAX_FEATURES])}
+
+        self.idf = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for term, column in self.vocabulary.items():
+            self.idf[column] = math.log((1 + len(documents)) / (1 + df[term])) + 1
+
+        self.ids = list(documents)
+        self.rows = {pk: i for i, pk in enumerate(self.ids)}
+        self.vectors = [self._vector(terms) for terms in documents.values()]
+
+        postings = defaultdict(lambda: ([], []))
+        for row, (columns, weights) in enumerate(self.vectors):
+            for column, weight in zip(columns.tolist(), weights.tolist()):
+                postings[column][0].append(row)
+                postings[column][1].append(weight)
+        self.postings = {
+            column: (np.array(rows, dtype=np.int64), np.array(weights, dtype=np.float32))
+            for column, (rows, weights) in postings.items()
+        }
+        return self
+
+    # --- Neighbours ---
+    def similarities(self, rows):
+        """A ``len(rows) x posts`` array of cosine similarities."""
+        result = np.zeros((len(rows), len(self.ids)), dtype=np.float32)
+        by_column = defaultdict(lambda: ([], []))
+        for i, row in enumerate(rows):
+            columns, weights = self.vectors[row]
+            for column, weight in zip(columns.tolist(), weights.tolist()):
+                by_column[column][0].append(i)
+                by_column[column][1].append(weight)
+        for column, (batch_rows, weights) in by_column.items():
+            post_rows, post_weights = self.postings[column]
+            result[np.ix_(batch_rows, post_rows)] += np.outer(weights, post_weights)
+        return result
+
+    def _top_k(self, similarities, exclude_row):
+        similarities[exclude_row] = -1
+        k = min(RELATED_POSTS, len(similarities) - 1)
+        if k <= 0:
+            return []
+        best = np.argpartition(-similarities, k - 1)[:k]
+        best = best[np.argsort(-similarities[best], kind='stable')]
+        return [(self.ids[i], float(similarities[i])) for i in best if similarities[i] > 0]
+
+    def neighbours(self, rows):
+        """{post id: [(related id, score)]} for the given rows, in batches."""
+        result = {}
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            for row, sims in zip(batch, self.similarities(batch)):
+                result[self.ids[row]] = self._top_k(sims, row)
+        return result
+
+    def affected_rows(self, post_ids):
+        """
+        The rows whose lists can change when ``post_ids`` changed: those posts,
+        the posts that list them now, and the posts whose weakest entry one of
+        them now beats.
+        """
+        rows = [self.rows[pk] for pk in post_ids if pk in self.rows]
+        affected = set(rows)
+        for chunk in _chunks(post_ids):
+            listing = RelatedPost.objects.filter(related_id__in=chunk).values_list('post_id', flat=True)
+            affected.update(self.rows[pk] for pk in listing if pk in self.rows)
+
+        weakest = np.zeros(len(self.ids), dtype=np.float32)
+        for pk, score in RelatedPost.objects.filter(rank=RELATED_POSTS - 1).values_list('post_id', 'score'):
+            if pk in self.rows:
+                weakest[self.rows[pk]] = score
+        for start in range(0, len(rows), BATCH_SIZE):
+            beaten = (self.similarities(rows[start:start + BATCH_SIZE]) > weakest).any(axis=0)
+            affected.update(np.flatnonzero(beaten).tolist())
+        return sorted(affected)
+
+
+def _store(neighbours, replace_all=False):
+    with transaction.atomic():
+        if replace_all:
+            RelatedPost.objects.all().delete()
+        else:
+            for chunk in _chunks(neighbours):
+                RelatedPost.objects.filter(post_id__in=chunk).delete()
+        RelatedPost.objects.bulk_create(
+            (
+                RelatedPost(post_id=pk, related_id=related_id, rank=rank, score=score)
+                for pk, related in neighbours.items()
+                for rank, (related_id, score) in enumerate(related)
+            ),
+            batch_size=1000,
+        )
+
+
+# ------------------ Queue ------------------
+def enqueue(post_ids):
+    """Queues posts for ``update_pending``; ids of posts that no longer exist are skipped."""
+    now = timezone.now()
+    for chunk in _chunks(set(post_ids)):
+        existing = Post.objects.filter(pk__in=chunk).values_list('pk', flat=True)
+        PendingRelatedUpdate.objects.bulk_create(
+            [PendingRelatedUpdate(post_id=pk, queued_at=now) for pk in existing],
+            update_conflicts=True, unique_fields=['post'], update_fields=['queued_at'],
+        )
+
+
+def _dequeue(post_ids, started):
+    # Posts queued again while the job ran stay for the next run.
+    for chunk in _chunks(post_ids):
+        PendingRelatedUpdate.objects.filter(post_id__in=chunk, queued_at__lte=started).delete()
+
+
+# ------------------ Jobs ------------------
+def rebuild():
+    """Recomputes every post's related list; returns ``(posts, terms)``."""
+    started = timezone.now()
+    index = RelatedIndex().fit()
+    neighbours = index.neighbours(list(range(len(index.ids))))
+    _store(neighbours, replace_all=True)
+    PendingRelatedUpdate.objects.filter(queued_at__lte=started).delete()
+    return len(neighbours), len(index.vocabulary)
+
+
+def update_pending():
+    """Recomputes the lists the queued posts can affect; returns how many lists were stored."""
+    started = timezone.now()
+    pending = list(PendingRelatedUpdate.objects.filter(queued_at__lte=started).values_list('post_id', flat=True))
+    if not pending:
+        return 0
+    index = RelatedIndex().fit()
+    neighbours = index.neighbours(index.affected_rows(pending))
+    _store(neighbours)
+    _dequeue(pending, started)
+    return len(neighbours)
+
+
+def related_posts(post):
+    """The stored related posts of ``post``, best first."""
+    links = RelatedPost.objects.filter(post=post).select_related('related__author').order_by('rank')
+    return [link.related for link in links]
@@ -0,0 +1,9 @@
+# File: blog/routing.py
+from django.urls import path
+
+from . import consumers
+
+websocket_urlpatterns = [
+    path('ws/notifications/', consumers.NotificationConsumer.as_asgi()),
+    path('ws/posts/<int:pk>/comments/', consumers.PostCommentsConsumer.as_asgi()),
+]
@@ -0,0 +1,269 @@
+# File: blog/search.py
+"""
+Full-text search over posts.
+
+Posts are indexed with their HTML stripped. On SQLite builds with FTS5 the
+index is the ``blog_post_fts`` virtual table and ranking uses its built-in
+BM25. Other databases use the SearchDocument/SearchPosting posting lists and
+BM25 is computed here. Either way the index is kept current from Post
+save/delete signals and can be rebuilt with ``manage.py rebuild_search_index``.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Avg
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .listings import card_queryset
+from .models import Post, SearchDocument, SearchPosting, plain_text
+
+
+FTS_TABLE = 'blog_post_fts'
+TITLE_WEIGHT = 5
+SNIPPET_WORDS = 32
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Highlight markers are inserted before escaping and turned into <mark> after.
+_MARK_START, _MARK_END = '\x02', '\x03'
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_fts_available = None
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) <= 64]
+
+
+def fts_available():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def _render_marks(text):
+    return mark_safe(escape(text).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+# ------------------ Indexing ------------------
+def _posting_rows(post):
+    title, body = plain_text(post.title), plain_text(post.content)
+    terms = Counter()
+    for term in tokenize(title):
+        terms[term] += TITLE_WEIGHT
+    terms.update(tokenize(body))
+    return title, body, terms
+
+
+def index_post(post):
+    """Adds or refreshes a single post in the index."""
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                [post.pk, plain_text(post.title), plain_text(post.content)],
+            )
+        return
+
+    title, body, terms = _posting_rows(post)
+    with transaction.atomic():
+        document, _ = SearchDocument.objects.update_or_create(
+            post=post, defaults={'title': title, 'body': body, 'length': sum(terms.values())}
+        )
+        document.postings.all().delete()
+        SearchPosting.objects.bulk_create(
+            SearchPosting(term=term, document=document, frequency=freq) for term, freq in terms.items()
+        )
+
+
+def remove_post(post_id):
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
+    else:
+        SearchDocument.objects.filter(post_id=post_id).delete()
+
+
+def rebuild_index(batch_size=500):
+    """Re-indexes every post in batches. Returns the number of posts indexed."""
+    posts = Post.objects.only('pk', 'title', 'content').order_by('pk')
+    total = 0
+
+    if fts_available():
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            batch = []
+            for post in posts.iterator(chunk_size=batch_size):
+                batch.append((post.pk, plain_text(post.title), plain_text(post.content)))
+                if len(batch) >= batch_size:
+                    cursor.executemany(f"INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)", batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(f"INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)", batch)
+                total += len(batch)
+        return total
+
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        documents, postings = [], []
+        for post in posts.iterator(chunk_size=batch_size):
+            title, body, terms = _posting_rows(post)
+            documents.append(SearchDocument(post_id=post.pk, title=title, body=body, length=sum(terms.values())))
+            postings.extend(
+                SearchPosting(term=term, document_id=post.pk, frequency=freq) for term, freq in terms.items()
+            )
+            if len(documents) >= batch_size:
+                SearchDocument.objects.bulk_create(documents)
+                SearchPosting.objects.bulk_create(postings, batch_size=5000)
+                total += len(documents)
+                documents, postings = [], []
+        SearchDocument.objects.bulk_create(documents)
+        SearchPosting.objects.bulk_create(postings, batch_size=5000)
+        total += len(documents)
+    return total
+
+
+# ------------------ Querying ------------------
+class SearchResults:
+    """
+    Lazily evaluated, ranked result list that works with Django's Paginator:
+    ``count()`` and slicing each run against the index, and slices return
+    Post objects carrying ``search_title`` and ``search_snippet`` with the
+    matched terms wrapped in <mark>.
+    """
+
+    def __init__(self, query):
+        self.query = query or ''
+        self.terms = list(dict.fromkeys(tokenize(self.query)))
+        self._count = None
+        self._ranking = None
+
+    def count(self):
+        if self._count is None:
+            if not self.terms:
+                self._count = 0
+            elif fts_available():
+                self._count = self._fts_count()
+            else:
+                self._count = len(self._posting_ranking())
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        if not self.terms or (stop is not None and stop <= start):
+            return []
+        if fts_available():
+            return self._fts_page(start, stop)
+        return self._posting_page(start, stop)
+
+    # --- FTS5 ---
+    def _match_expression(self):
+        return ' '.join(f'"{term}"*' for term in self.terms)
+
+    def _fts_count(self):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [self._match_expression()])
+                return cursor.fetchone()[0]
+        except OperationalError:
+            return 0
+
+    def _fts_page(self, start, stop):
+        limit = -1 if stop is None else stop - start
+        sql = (
+            f"SELECT rowid, highlight({FTS_TABLE}, 0, %s, %s), "
+            f"snippet({FTS_TABLE}, 1, %s, %s, '…', {SNIPPET_WORDS}) "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, {float(TITLE_WEIGHT)}, 1.0) LIMIT %s OFFSET %s"
+        )
+        params = [_MARK_START, _MARK_END, _MARK_START, _MARK_END, self._match_expression(), limit, start]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+        except OperationalError:
+            return []
+        return self._attach_posts([(pk, title, snippet) for pk, title, snippet in rows])
+
+    # --- Posting lists ---
+    def _posting_ranking(self):
+        """[(post_id, score)] best first; every query term must match (as a prefix)."""
+        if self._ranking is not None:
+            return self._ranking
+
+        total_docs = SearchDocument.objects.count()
+        avg_length = SearchDocument.objects.aggregate(avg=Avg('length'))['avg'] or 1
+        scores = defaultdict(float)
+        matched = None
+
+        for term in self.terms:
+            postings = defaultdict(dict)
+            for word, doc_id, freq in SearchPosting.objects.filter(term__startswith=term).values_list(
+                'term', 'document_id', 'frequency'
+            ):
+                postings[word][doc_id] = freq
+            docs_for_term = set().union(*(d.keys() for d in postings.values())) if postings else set()
+            matched = docs_for_term if matched is None else matched & docs_for_term
+            if not matched:
+                self._ranking = []
+                return self._ranking
+
+            lengths = dict(SearchDocument.objects.filter(pk__in=docs_for_term).values_list('pk', 'length'))
+            for word, docs in postings.items():
+                idf = math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, freq in docs.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths.get(doc_id, 0) / avg_length)
+                    scores[doc_id] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+
+        self._ranking = sorted(((pk, scores[pk]) for pk in matched), key=lambda r: (-r[1], -r[0]))
+        return self._ranking
+
+    def _posting_page(self, start, stop):
+        page_ids = [pk for pk, _ in self._posting_ranking()[start:stop]]
+        documents = SearchDocument.objects.in_bulk(page_ids)
+        rows = [
+            (pk, self._highlight(documents[pk].title), self._snippet(documents[pk].body))
+            for pk in page_ids if pk in documents
+        ]
+        return self._attach_posts(rows)
+
+    def _pattern(self):
+        return re.compile(r'\b(' + '|'.join(re.escape(t) for t in self.terms) + r')\w*', re.IGNORECASE)
+
+    def _highlight(self, text):
+        return self._pattern().sub(lambda m: f'{_MARK_START}{m.group(0)}{_MARK_END}', text)
+
+    def _snippet(self, text):
+        words = text.split()
+        pattern = self._pattern()
+        first = next((i for i, word in enumerate(words) if pattern.search(word)), 0)
+        begin = max(first - SNIPPET_WORDS // 4, 0)
+        snippet = ' '.join(words[begin:begin + SNIPPET_WORDS])
+        prefix = '… ' if begin > 0 else ''
+        suffix = ' …' if begin + SNIPPET_WORDS < len(words) else ''
+        return f'{prefix}{self._highlight(snippet)}{suffix}'
+
+    # --- Shared ---
+    @staticmethod
+    def _attach_posts(rows):
+        posts = card_queryset().in_bulk([pk for pk, _, _ in rows])
+        results = []
+        for pk, title, snippet in rows:
+            post = posts.get(pk)
+            if post is None:
+                continue
+            post.search_title = _render_marks(title)
+            post.search_snippet = _render_marks(snippet)
+            results.append(post)
+        return results
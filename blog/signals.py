@@ -0,0 +1,252 @@
+# File: blog/signals.py
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import dashboard, homepage, profiles, related, search, stats
+from .notifications import adjust_unread_count
+from .context_processors import invalidate_site_cache
+from .models import Comment, Genre, Notification, Post, Profile, RelatedPost, SiteSettings, UserInquiry
+from .realtime import push_notification
+from .suggest import index as suggestion_index
+from .threads import bump_thread_version
+
+
+# ------------------ Comment thread cache ------------------
+# Versions are bumped on commit, so a page rendered in between cannot be cached
+# under the new version while still missing the change.
+def _bump_on_commit(post_id):
+    transaction.on_commit(lambda: bump_thread_version(post_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_thread_on_comment_change(sender, instance, **kwargs):
+    """Creates, edits, status changes and deletes retire the cached thread."""
+    _bump_on_commit(instance.post_id)
+
+
+
+# ------------------ Homepage snapshot ------------------
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_homepage(sender, **kwargs):
+    transaction.on_commit(homepage.invalidate)
+
+
+# ------------------ Search index ------------------
+@receiver(post_save, sender=Post)
+def index_post_on_save(sender, instance, **kwargs):
+    transaction.on_commit(lambda: search.index_post(instance))
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_index(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(lambda: search.remove_post(post_id))
+
+
+# ------------------ Related posts ------------------
+# Only queues work; ``build_related_posts --pending`` recomputes the lists.
+@receiver(post_save, sender=Post)
+def queue_related_posts(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(lambda: related.enqueue([post_id]))
+
+
+@receiver(pre_delete, sender=Post)
+def queue_posts_listing_deleted_post(sender, instance, **kwargs):
+    # Read before the cascade removes the links; queued once the delete commits.
+    listing = list(RelatedPost.objects.filter(related_id=instance.pk).values_list('post_id', flat=True))
+    if listing:
+        transaction.on_commit(lambda: related.enqueue(listing))
+
+
+# ------------------ Suggestion index ------------------
+@receiver(post_save, sender=Post)
+def suggest_post_on_save(sender, instance, **kwargs):
+    suggestion_index.upsert('post', instance.pk, instance.title)
+    suggestion_index.upsert('author', instance.author_id, instance.author.username)
+
+
+@receiver(post_delete, sender=Post)
+def unsuggest_post_on_delete(sender, instance, **kwargs):
+    suggestion_index.remove('post', instance.pk)
+    if not Post.objects.filter(author_id=instance.author_id).exclude(pk=instance.pk).exists():
+        suggestion_index.remove('author', instance.author_id)
+
+
+@receiver(post_save, sender=Genre)
+def suggest_genre_on_save(sender, instance, **kwargs):
+    suggestion_index.upsert('genre', instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=Genre)
+def unsuggest_genre_on_delete(sender, instance, **kwargs):
+    suggestion_index.remove('genre', instance.pk)
+
+
+@receiver(post_save, sender=User)
+def rename_author_suggestion(sender, instance, created, **kwargs):
+    if not created:
+        suggestion_index.rename('author', instance.pk, instance.username)
+
+
+# ------------------ Previous state ------------------
+# The counter receivers below compare a saved row with what it was. One
+# pre_save receiver per model reads every column they need in one query;
+# new rows and raw (fixture) saves read nothing.
+def _remember_previous(instance, raw, *fields):
+    model = type(instance)
+    fields = list(dict.fromkeys([*fields, *stats.tracked_fields(model)]))
+    row = None
+    if fields and not raw and not instance._state.adding:
+        row = model.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._previous_stat_flags = stats.flags(model, row) if row else {}
+    return row or {}
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post(sender, instance, raw, **kwargs):
+    previous = _remember_previous(instance, raw, 'genre_id', 'author_id')
+    instance._previous_genre_id = previous.get('genre_id')
+    instance._previous_author_id = previous.get('author_id')
+
+
+@receiver(pre_save, sender=Comment)
+def remember_previous_comment(sender, instance, raw, **kwargs):
+    previous = _remember_previous(instance, raw, 'author_id', 'status')
+    instance._previous_author_status = (previous['author_id'], previous['status']) if previous else None
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=UserInquiry)
+def remember_previous_row(sender, instance, raw, **kwargs):
+    _remember_previous(instance, raw)
+
+
+# ------------------ Genre post counts ------------------
+def _move_genre_count(genre_id, delta):
+    if genre_id:
+        Genre.objects.filter(pk=genre_id).update(post_count=F('post_count') + delta)
+        invalidate_site_cache('genres')
+
+
+@receiver(post_save, sender=Post)
+def count_post_in_genre(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous = None if created else instance._previous_genre_id
+    if previous != instance.genre_id:
+        _move_genre_count(previous, -1)
+        _move_genre_count(instance.genre_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post_in_genre(sender, instance, **kwargs):
+    _move_genre_count(instance.genre_id, -1)
+
+
+# ------------------ Profiles ------------------
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, **kwargs):
+    if created:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post_for_author(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous = None if created else instance._previous_author_id
+    if previous != instance.author_id:
+        profiles.adjust(previous, post_count=-1)
+        profiles.adjust(instance.author_id, post_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post_for_author(sender, instance, **kwargs):
+    profiles.adjust(instance.author_id, post_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_for_author(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    author_id, status = (None, None) if created else (getattr(instance, '_previous_author_status', None) or (None, None))
+    was_counted, counted = status == 'approved', instance.status == 'approved'
+    if author_id == instance.author_id:
+        profiles.adjust(author_id, comment_count=counted - was_counted)
+        return
+    profiles.adjust(author_id, comment_count=-was_counted, vote_total=-instance.score)
+    profiles.adjust(instance.author_id, comment_count=int(counted), vote_total=0 if created else instance.score)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment_for_author(sender, instance, **kwargs):
+    profiles.adjust(
+        instance.author_id, comment_count=-(instance.status == 'approved'), vote_total=-instance.score
+    )
+
+
+# ------------------ Dashboard statistics ------------------
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=UserInquiry)
+def count_row_in_stats(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    stats.apply_change(sender, instance, getattr(instance, '_previous_stat_flags', {}), created=created)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=UserInquiry)
+def uncount_row_in_stats(sender, instance, **kwargs):
+    stats.apply_change(sender, instance, {}, deleted=True)
+
+
+# ------------------ Author statistics ------------------
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def drop_cached_author_stats(sender, instance, **kwargs):
+    author_id = instance.author_id
+    transaction.on_commit(lambda: dashboard.forget_author_stats(author_id))
+
+
+# ------------------ Global template context ------------------
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_cached_genres(sender, **kwargs):
+    invalidate_site_cache('genres')
+
+
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_delete, sender=SiteSettings)
+def invalidate_cached_site_settings(sender, **kwargs):
+    invalidate_site_cache('site_settings')
+
+
+# ------------------ Live notifications ------------------
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, raw, **kwargs):
+    if created and not instance.read and not raw:
+        adjust_unread_count(instance.user_id, 1)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.read:
+        adjust_unread_count(instance.user_id, -1)
+
+
+@receiver(post_save, sender=Notification)
+def push_new_notification(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: push_notification(instance))
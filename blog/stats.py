@@ -0,0 +1,99 @@
+# File: blog/stats.py
+"""
+Materialized counters for the admin dashboard.
+
+Each counter is one DashboardStat row, so the dashboard reads all of them with
+a single query instead of counting the posts, comments and users tables on
+every load. Signals move the counters with atomic UPDATEs as rows are created,
+changed and deleted (see ``TRACKED``); bulk changes that bypass signals call
+``recount``. ``manage.py reconcile_dashboard_stats`` recounts everything and
+is meant to run periodically.
+"""
+from django.contrib.auth.models import User
+from django.db.models import F
+
+from .models import Comment, DashboardStat, Post, UserInquiry
+
+
+MODERATION_STATUSES = ('pending_review', 'hidden')
+
+# model -> [(stat key, field, test)]. A row adds one to the stat while
+# ``test(getattr(row, field))`` is true; a ``None`` field counts every row.
+TRACKED = {
+    Post: [('total_posts', None, None), ('posts_with_photos', 'photo', bool)],
+    Comment: [
+        ('total_comments', None, None),
+        ('comments_to_moderate', 'status', lambda status: status in MODERATION_STATUSES),
+    ],
+    User: [('total_users', None, None)],
+    UserInquiry: [('new_inquiries', 'status', lambda status: status == 'new')],
+}
+
+
+def _querysets():
+    """The source of truth for every counter."""
+    return {
+        'total_posts': Post.objects.all(),
+        'total_comments': Comment.objects.all(),
+        'total_users': User.objects.all(),
+        'posts_with_photos': Post.objects.exclude(photo='').exclude(photo__isnull=True),
+        'comments_to_moderate': Comment.objects.filter(status__in=MODERATION_STATUSES),
+        'new_inquiries': UserInquiry.objects.filter(status='new'),
+    }
+
+
+def get_stats():
+    """Every counter as a dict; missing rows are computed on first use."""
+    stats = dict(DashboardStat.objects.values_list('key', 'value'))
+    if len(stats) < len(_querysets()):
+        reconcile()
+        stats = dict(DashboardStat.objects.values_list('key', 'value'))
+    return stats
+
+
+def adjust(key, delta):
+    if delta:
+        DashboardStat.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def recount(*keys):
+    querysets = _querysets()
+    for key in keys:
+        DashboardStat.objects.update_or_create(key=key, defaults={'value': querysets[key].count()})
+
+
+def reconcile():
+    """Recounts every counter; returns how many had drifted."""
+    current = dict(DashboardStat.objects.values_list('key', 'value'))
+    drifted = 0
+    for key, queryset in _querysets().items():
+        actual = queryset.count()
+        if current.get(key) != actual:
+            DashboardStat.objects.update_or_create(key=key, defaults={'value': actual})
+            drifted += 1
+    return drifted
+
+
+# ------------------ Signal helpers ------------------
+def flags(model, values):
+    """{stat key: 0/1} for the conditional stats of ``model`` given ``{field: value}``."""
+    return {key: int(test(values[field])) for key, field, test in TRACKED[model] if field}
+
+
+def tracked_fields(model):
+    """The fields the conditional stats of ``model`` depend on."""
+    return [field for _, field, _ in TRACKED[model] if field]
+
+
+def apply_change(model, instance, previous, created=False, deleted=False):
+    """Moves the counters of ``model`` for one created, updated or deleted row."""
+    sign = -1 if deleted else 1
+    current = flags(model, {field: getattr(instance, field) for field in tracked_fields(model)})
+    for key, field, _ in TRACKED[model]:
+        if field is None:
+            if created or deleted:
+                adjust(key, sign)
+        elif deleted:
+            adjust(key, -current[key])
+        else:
+            adjust(key, current[key] - previous.get(key, 0))
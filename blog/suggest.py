@@ -0,0 +1,217 @@
+# File: blog/suggest.py
+"""
+Search-as-you-type suggestions served from memory.
+
+Post titles, genre names and author usernames are kept in a sorted array of
+lower-cased keys (one key per word position, so "shoes" finds "Running
+Shoes"). A lookup is a binary search plus a short scan, and answers are cached
+per prefix. The index is loaded when the server process starts (see
+``warm``) and kept current from model signals, so lookups never touch the
+database.
+
+Signals only reach the process that saved the change, so every change also
+bumps a shared version counter in the cache on commit. A process that sees a
+version it did not apply, or whose index is older than INDEX_MAX_AGE (which
+also covers per-process caches), reloads the index in a background thread
+and keeps answering from the old one meanwhile.
+"""
+import bisect
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.urls import reverse
+
+from .models import Genre, Post
+
+
+MAX_SUGGESTIONS = 8
+MIN_PREFIX_LENGTH = 2
+_PREFIX_CACHE_SIZE = 2048
+_KIND_ORDER = {'post': 0, 'genre': 1, 'author': 2}
+VERSION_KEY = 'suggest-index-version'
+VERSION_CHECK_INTERVAL = 5
+INDEX_MAX_AGE = 60 * 5
+
+
+def current_version():
+    cache.add(VERSION_KEY, 0, None)
+    return cache.get(VERSION_KEY, 0)
+
+
+def _bump_version():
+    cache.add(VERSION_KEY, 0, None)
+    return cache.incr(VERSION_KEY)
+
+
+def _keys_for(label):
+    words = label.lower().split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._keys = []        # sorted (key, kind, pk)
+        self._entries = {}     # (kind, pk) -> {'type', 'label', 'url'}
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._checked_at = 0
+        self.loaded = False
+        self.loaded_at = 0
+        self.version = None
+
+    # --- Building ---
+    def load(self):
+        # Read first: a change committed while loading leaves the index one version behind.
+        version = current_version()
+        keys, entries = [], {}
+        for pk, title in Post.objects.values_list('pk', 'title'):
+            entries[('post', pk)] = self._entry('post', pk, title)
+        for pk, name in Genre.objects.values_list('pk', 'name'):
+            entries[('genre', pk)] = self._entry('genre', pk, name)
+        for pk, username in Post.objects.values_list('author_id', 'author__username').distinct():
+            entries[('author', pk)] = self._entry('author', pk, username)
+        for (kind, pk), entry in entries.items():
+            keys.extend((key, kind, pk) for key in _keys_for(entry['label']))
+        keys.sort()
+        with self._lock:
+            self._keys, self._entries, self._cache = keys, entries, {}
+            self.loaded = True
+            self.loaded_at = self._checked_at = time.monotonic()
+            self.version = version
+
+    def is_stale(self):
+        now = time.monotonic()
+        if now - self.loaded_at > INDEX_MAX_AGE:
+            return True
+        if now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        return current_version() != self.version
+
+    def refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.load()
+            finally:
+                self._refreshing = False
+                connection.close()
+
+        threading.Thread(target=run, name='suggest-index-refresh', daemon=True).start()
+
+    def _publish(self):
+        """Announces a change to other processes once it is committed."""
+        def bump():
+            version = _bump_version()
+            # Adopt the new version only if this process had every earlier one.
+            if self.version is not None and version == self.version + 1:
+                self.version = version
+        transaction.on_commit(bump)
+
+    @staticmethod
+    def _entry(kind, pk, label):
+        if kind == 'post':
+            url = reverse('post_detail', kwargs={'pk': pk})
+        elif kind == 'author':
+            url = reverse('profile_page', kwargs={'username': label})
+        else:
+            url = reverse('genre_posts', kwargs={'pk': pk})
+        return {'type': kind, 'label': label, 'url': url}
+
+    # --- Incremental updates ---
+    def upsert(self, kind, pk, label):
+        entry = self._entries.get((kind, pk))
+        if entry is not None and entry['label'] == label:
+            return
+        self._publish()
+        if not self.loaded:
+            return
+        with self._lock:
+            self._remove_locked(kind, pk)
+            entry = self._entry(kind, pk, label)
+            self._entries[(kind, pk)] = entry
+            for key in _keys_for(label):
+                bisect.insort(self._keys, (key, kind, pk))
+            self._cache.clear()
+
+    def rename(self, kind, pk, label):
+        """
+        Like upsert, but only for entries that are already indexed. Renames
+        this process has not indexed are left to the other processes' INDEX_MAX_AGE.
+        """
+        if (kind, pk) in self._entries:
+            self.upsert(kind, pk, label)
+
+    def remove(self, kind, pk):
+        self._publish()
+        if not self.loaded:
+            return
+        with self._lock:
+            self._remove_locked(kind, pk)
+            self._cache.clear()
+
+    def _remove_locked(self, kind, pk):
+        entry = self._entries.pop((kind, pk), None)
+        if entry is None:
+            return
+        for key in _keys_for(entry['label']):
+            i = bisect.bisect_left(self._keys, (key, kind, pk))
+            if i < len(self._keys) and self._keys[i] == (key, kind, pk):
+                del self._keys[i]
+
+    # --- Lookup ---
+    def suggest(self, prefix, limit=MAX_SUGGESTIONS):
+        prefix = ' '.join(prefix.lower().split())
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return []
+        cached = self._cache.get(prefix)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            seen, found = set(), []
+            i = bisect.bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and len(found) < limit * 4:
+                key, kind, pk = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                if (kind, pk) not in seen:
+                    seen.add((kind, pk))
+                    found.append(self._entries[(kind, pk)])
+                i += 1
+
+            # Whole-label prefix matches first, then posts before genres and authors.
+            found.sort(key=lambda e: (
+                not e['label'].lower().startswith(prefix), _KIND_ORDER[e['type']], len(e['label'])
+            ))
+            results = found[:limit]
+            if len(self._cache) >= _PREFIX_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[prefix] = results
+        return results
+
+index = PrefixIndex()
+
+
+def warm():
+    """Loads the index when a server process starts, so no request pays for it."""
+    try:
+        index.load()
+    except DatabaseError:
+        # Not migrated yet; the first lookup loads it instead.
+        pass
+
+
+def suggest(prefix):
+    if not index.loaded:
+        index.load()
+    elif index.is_stale():
+        index.refresh_in_background()
+    return index.suggest(prefix)
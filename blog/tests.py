@@ -1,3 +1,679 @@
-from django.test import TestCase
+import importlib
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.admin import site as admin_site
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import serializers
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models.signals import post_save
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    context_processors, moderation, notifications, profiles, realtime, related, search, stats, suggest, threads,
+    views,
+)
+from .admin import CommentAdmin
+from .models import Comment, Genre, Notification, PendingRelatedUpdate, Post, Profile, RelatedPost
+
+
+class QueryBudgetMixin:
+    """
+    Query budgets for views. ``assertQueryBudget`` requests a URL once per
+    data size in ``sizes`` (seeding more rows in between through ``seed``) and
+    fails if any request exceeds ``budget`` queries or if the count changes
+    with the amount of data, which is what an N+1 looks like.
+    """
+    sizes = (3, 9)
+
+    def seed(self, count):
+        raise NotImplementedError
+
+    def assertQueryBudget(self, url, budget, **extra):
+        counts = []
+        seeded = 0
+        for size in self.sizes:
+            self.seed(size - seeded)
+            seeded = size
+            cache.clear()
+            context_processors._site_cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, **extra)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertLessEqual(
+            max(counts), budget,
+            f"{url} ran {max(counts)} queries (budget {budget}):\n"
+            + "\n".join(q['sql'] for q in queries.captured_queries),
+        )
+        self.assertEqual(len(set(counts)), 1, f"{url} query count grows with data: {dict(zip(self.sizes, counts))}")
+
+
+class PostListingQueryTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author', password='pw')
+        cls.genre = Genre.objects.create(name='Running')
+
+    def seed(self, count):
+        for _ in range(count):
+            n = Post.objects.count()
+            writer = User.objects.create_user(f'writer{n}', password='pw')
+            genre = Genre.objects.create(name=f'Genre {n}') if n % 2 else self.genre
+            post = Post.objects.create(
+                title=f'Marathon notes {n}', content=f'<p>Marathon training log {n}</p>', author=writer, genre=genre
+            )
+            for i in range(3):
+                Comment.objects.create(post=post, author=self.author, text=f'Comment {i}', status='approved')
+        search.rebuild_index()
+
+    def test_post_list(self):
+        self.assertQueryBudget(reverse('post_list'), 8)
+
+    def test_post_list_sorted_by_comments(self):
+        self.assertQueryBudget(reverse('post_list') + '?sort=comments', 8)
+
+    def test_ajax_post_list(self):
+        self.assertQueryBudget(reverse('ajax_post_list'), 1)
+
+    def test_ajax_post_list_numbered_page(self):
+        self.assertQueryBudget(reverse('ajax_post_list') + '?page=2&sort=comments', 2)
+
+    def test_genre_posts(self):
+        self.assertQueryBudget(reverse('genre_posts', args=[self.genre.pk]), 4)
+
+    def test_search_results(self):
+        self.assertQueryBudget(reverse('search_results') + '?q=marathon', 5)
+
+    def test_profile_page(self):
+        self.assertQueryBudget(reverse('profile_page', args=['author']), 8)
+
+    def test_cards_show_approved_comment_counts(self):
+        self.seed(1)
+        Comment.objects.create(post=Post.objects.get(), author=self.author, text='Pending', status='pending_review')
+        response = self.client.get(reverse('ajax_post_list'))
+        self.assertEqual(response.context['page_obj'][0].approved_comment_count, 3)
+
+    def test_numbered_pages_match_the_homepage(self):
+        self.seed(7)
+        for query in ('?page=2', '?page=2&sort=oldest', '?page=2&sort=comments'):
+            homepage = self.client.get(reverse('post_list') + query)
+            response = self.client.get(reverse('ajax_post_list') + query)
+            self.assertEqual(
+                [post.pk for post in response.context['page_obj']],
+                [post.pk for post in homepage.context['page_obj']],
+            )
+            self.assertIn('?page=1', response.json()['pagination_html'])
+
+
+class ConcurrentReportTests(TransactionTestCase):
+    reporters = 8
+
+    def setUp(self):
+        author = User.objects.create_user('author', password='pw')
+        post = Post.objects.create(title='Contested', content='<p>Hot take</p>', author=author)
+        self.comment = Comment.objects.create(post=post, author=author, text='Flame bait', status='approved')
+        self.users = [User.objects.create_user(f'reporter{n}', password='pw') for n in range(self.reporters)]
+        stats.reconcile()
+
+    def report_in_parallel(self, users):
+        self.run_in_parallel(moderation.report, users)
+
+    def run_in_parallel(self, action, users):
+        barrier = threading.Barrier(len(users))
+        errors = []
+
+        def run(user):
+            try:
+                comment = Comment.objects.get(pk=self.comment.pk)
+                barrier.wait()
+                for _ in range(50):
+                    try:
+                        return action(comment, user)
+                    except OperationalError as exc:
+                        # SQLite allows one writer at a time; wait for the lock.
+                        if 'locked' not in str(exc):
+                            raise
+                        time.sleep(0.01)
+                raise AssertionError("Database stayed locked")
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_parallel_reports_are_all_counted(self):
+        # Every reporter twice: duplicates must not count.
+        self.report_in_parallel(self.users + self.users)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.report_count, self.reporters)
+        self.assertEqual(self.comment.reported_by.count(), self.reporters)
+        self.assertEqual(self.comment.status, 'hidden')
+        self.assertEqual(stats.reconcile(), 0)
+
+    def test_comment_is_hidden_at_the_threshold(self):
+        self.report_in_parallel(self.users[:moderation.REPORTS_TO_HIDE - 1])
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.status, 'approved')
+        self.report_in_parallel(self.users[moderation.REPORTS_TO_HIDE - 1:])
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.status, 'hidden')
+        self.assertEqual(self.comment.report_count, self.reporters)
+
+    def test_approval_settles_earlier_reports(self):
+        threshold = moderation.REPORTS_TO_HIDE
+        self.report_in_parallel(self.users[:threshold])
+        moderation.decide(Comment.objects.filter(pk=self.comment.pk), 'approve')
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.status, self.comment.report_count), ('approved', 0))
+
+        self.report_in_parallel(self.users[threshold:threshold + 1])
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.status, self.comment.report_count), ('approved', 1))
+
+        self.report_in_parallel(self.users[threshold + 1:2 * threshold])
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.status, self.comment.report_count), ('hidden', threshold))
+        self.assertEqual(stats.reconcile(), 0)
+
+    def test_parallel_vote_clicks_move_the_score_once(self):
+        # Three clicks each: every user ends up upvoting, whatever the interleaving.
+        self.run_in_parallel(lambda comment, user: views._toggle_vote(comment, user, up=True), self.users * 3)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.upvotes.count(), self.reporters)
+        self.assertEqual(self.comment.score, self.reporters)
+        self.assertEqual(profiles.reconcile(), 0)
+
+        self.run_in_parallel(lambda comment, user: views._toggle_vote(comment, user, up=False), self.users)
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.upvotes.count(), self.comment.downvotes.count()), (0, self.reporters))
+        self.assertEqual(self.comment.score, -self.reporters)
+        self.assertEqual(profiles.reconcile(), 0)
+
+
+class RelatedPostQueueTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pw')
+        self.posts = [
+            Post.objects.create(title=f'Trail running {n}', content='<p>Trail running shoes and hills</p>', author=self.author)
+            for n in range(3)
+        ] + [Post.objects.create(title='Sourdough', content='<p>Baking bread at home</p>', author=self.author)]
+        related.rebuild()
+
+    def test_saves_only_queue_work(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(title='Trail running 3', content='<p>Trail running hills</p>', author=self.author)
+        self.assertFalse(RelatedPost.objects.filter(post=post).exists())
+        self.assertTrue(PendingRelatedUpdate.objects.filter(post=post).exists())
+
+        self.assertGreater(related.update_pending(), 1)
+        self.assertFalse(PendingRelatedUpdate.objects.exists())
+        self.assertIn(post, related.related_posts(self.posts[0]))
+        self.assertNotIn(self.posts[3], related.related_posts(post))
+
+    def test_deleting_a_post_queues_the_posts_listing_it(self):
+        listing = set(RelatedPost.objects.filter(related=self.posts[0]).values_list('post_id', flat=True))
+        self.assertTrue(listing)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[0].delete()
+        self.assertEqual(set(PendingRelatedUpdate.objects.values_list('post_id', flat=True)), listing)
+        related.update_pending()
+        self.assertEqual(len(related.related_posts(self.posts[1])), 1)
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pw')
+        self.post = Post.objects.create(title='Hill repeats', content='<p>Hills</p>', author=self.author)
+
+    def comment(self, parent=None, text='Text', **fields):
+        return Comment.objects.create(post=self.post, author=self.author, text=text, parent=parent, **fields)
+
+    def test_fixture_comments_get_paths(self):
+        # The reply comes before its parent, as a hand-written fixture may have it.
+        rows = [(12, 11), (11, None), (13, 12), (14, None)]
+        fixture = [
+            {'model': 'blog.comment', 'pk': pk, 'fields': {
+                'post': self.post.pk, 'author': self.author.pk, 'text': f'Loaded {pk}', 'parent': parent,
+                'created_at': '2026-01-01T00:00:00Z', 'status': 'approved',
+            }}
+            for pk, parent in rows
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as handle:
+            json.dump(fixture, handle)
+            handle.flush()
+            call_command('loaddata', handle.name, verbosity=0)
+
+        root = Comment.objects.get(pk=11)
+        subtree = Comment.objects.filter(threads.subtree_filter(self.post.pk, [root.path])).order_by('pk')
+        self.assertEqual([c.pk for c in subtree], [11, 12, 13])
+        self.assertEqual([c.depth for c in subtree], [0, 1, 2])
+        replies = threads.load_replies(root, AnonymousUser())
+        self.assertEqual([(r.pk, [g.pk for g in r.visible_replies]) for r in replies], [(12, [13])])
+
+    def test_subtrees_stay_with_their_roots(self):
+        first, second = self.comment(), self.comment()
+        reply = self.comment(parent=first)
+        nested = self.comment(parent=reply)
+        other = self.comment(parent=second)
+        other_post = Post.objects.create(title='Tempo', content='<p>Tempo</p>', author=self.author)
+        Comment.objects.create(post=other_post, author=self.author, text='Elsewhere', path=first.path + '000000ff')
+
+        roots, _ = threads.load_thread_page(self.post, AnonymousUser(), 'oldest')
+        self.assertEqual(roots, [first, second])
+        self.assertEqual(roots[0].visible_replies, [reply])
+        self.assertEqual(roots[0].visible_replies[0].visible_replies, [nested])
+        self.assertEqual(roots[1].visible_replies, [other])
+        self.assertEqual(threads.load_replies(first, AnonymousUser()), [reply])
+
+    def test_previews_are_limited_per_root(self):
+        root = self.comment()
+        replies = [self.comment(parent=root) for _ in range(threads.REPLY_PREVIEW_LIMIT + 2)]
+        for reply in replies:
+            self.comment(parent=reply)
+        self.comment(parent=root, status='rejected')
+
+        with CaptureQueriesContext(connection) as queries:
+            roots, _ = threads.load_thread_page(self.post, AnonymousUser(), 'oldest')
+        shown = replies[:threads.REPLY_PREVIEW_LIMIT]
+        self.assertEqual(roots[0].visible_replies, shown)
+        self.assertEqual(roots[0].more_replies, 2)
+        subtree_query = next(q['sql'] for q in queries.captured_queries if '"path" >=' in q['sql'])
+        self.assertEqual(subtree_query.count('"path" >='), len(shown))
+
+    def test_cursor_round_trip(self):
+        comment = self.comment(score=7)
+        for sort_option in threads.SORT_OPTIONS:
+            cursor = threads.encode_cursor(comment, sort_option)
+            field = 'score' if sort_option == 'top' else 'created_at'
+            self.assertEqual(threads.decode_cursor(cursor, sort_option), (getattr(comment, field), comment.pk))
+
+    def test_malformed_cursors_start_from_the_top(self):
+        first = self.comment()
+        for cursor in ('', 'not base64!', 'bm8tcGlwZQ', 'eHx5', '//8'):
+            self.assertIsNone(threads.decode_cursor(cursor, 'top'), cursor)
+        roots, _ = threads.load_thread_page(self.post, AnonymousUser(), 'newest', cursor='eHx5')
+        self.assertEqual(roots, [first])
+
+    def test_cursor_breaks_ties_by_id(self):
+        created_at = timezone.now()
+        comments = [self.comment(created_at=created_at) for _ in range(5)]
+        for sort_option, expected in (('newest', comments[::-1]), ('oldest', comments), ('top', comments[::-1])):
+            seen, cursor = [], None
+            while True:
+                roots, cursor = threads.load_thread_page(self.post, AnonymousUser(), sort_option, cursor, page_size=2)
+                seen += roots
+                if cursor is None:
+                    break
+            self.assertEqual(seen, expected, sort_option)
+
+    def test_cached_pages_are_retired_by_comment_changes_only(self):
+        comment = self.comment(text='First take')
+        url = reverse('sort_comments', args=[self.post.pk])
+        cache.clear()
+        first = self.client.get(url).json()['html']
+
+        Comment.objects.filter(pk=comment.pk).update(text='Changed behind the cache')
+        self.assertEqual(self.client.get(url).json()['html'], first)
+
+        voter = User.objects.create_user('voter', password='pw')
+        self.client.force_login(voter)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('comment_action'), {'comment_id': comment.pk, 'action': 'upvote'},
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+            )
+        self.client.logout()
+        self.assertEqual(self.client.get(url).json()['html'], first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comment(text='Second take')
+        html = self.client.get(url).json()['html']
+        self.assertIn('Second take', html)
+        self.assertIn('Changed behind the cache', html)
+
+    def test_admin_status_changes_retire_the_thread_on_commit(self):
+        comment = self.comment(text='First take')
+        version = threads.get_thread_version(self.post.pk)
+        model_admin = CommentAdmin(Comment, admin_site)
+        with self.captureOnCommitCallbacks() as callbacks:
+            model_admin._set_status(Comment.objects.filter(pk=comment.pk), 'pending_review')
+            self.assertEqual(threads.get_thread_version(self.post.pk), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(threads.get_thread_version(self.post.pk), version)
+
+    def test_undecodable_cursors_share_the_first_page(self):
+        comment = self.comment(text='First take')
+        url = reverse('sort_comments', args=[self.post.pk])
+        cache.clear()
+        first = self.client.get(url).json()['html']
+        Comment.objects.filter(pk=comment.pk).update(text='Changed behind the cache')
+        for cursor in ('garbage', 'x' * 500):
+            self.assertEqual(self.client.get(url, {'cursor': cursor}).json()['html'], first)
+
+    def test_top_pages_are_not_cached(self):
+        comment = self.comment(text='First take')
+        url = reverse('sort_comments', args=[self.post.pk])
+        cache.clear()
+        self.client.get(url, {'sort': 'top'})
+        Comment.objects.filter(pk=comment.pk).update(text='Changed behind the cache')
+        self.assertIn('Changed behind the cache', self.client.get(url, {'sort': 'top'}).json()['html'])
+
+
+class SuggestionIndexTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pw')
+        Post.objects.create(title='Hill repeats', content='<p>Hills</p>', author=self.author)
+        suggest.index.load()
+
+    def test_local_changes_keep_the_index_current(self):
+        version = suggest.index.version
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Hill sprints', content='<p>Sprints</p>', author=self.author)
+        self.assertEqual(suggest.index.version, version + 1)
+        self.assertEqual(len(suggest.suggest('hill')), 2)
+
+    def test_changes_from_other_processes_trigger_a_reload(self):
+        suggest._bump_version()
+        Post.objects.filter(title='Hill repeats').update(title='Hills forever')
+        suggest.index._checked_at = 0
+        self.assertTrue(suggest.index.is_stale())
+        suggest.index.load()
+        self.assertFalse(suggest.index.is_stale())
+        self.assertEqual([entry['label'] for entry in suggest.suggest('hills')], ['Hills forever'])
+
+
+class NotificationTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='pw')
+        self.reader = User.objects.create_user('reader', password='pw')
+        self.post = Post.objects.create(title='Hill repeats', content='<p>Hills</p>', author=self.author)
+
+    def notify(self):
+        comment = Comment.objects.create(post=self.post, author=self.reader, text='Nice')
+        return notifications.deliver([Notification(
+            user=self.author, notification_type='new_comment', message='reader commented', comment=comment,
+            post=self.post,
+        )])[0]
+
+    def test_comments_on_a_post_are_coalesced(self):
+        first = self.notify()
+        _, etag = realtime.notification_state(self.author.pk)
+        with mock.patch.object(realtime, '_group_send') as group_send:
+            with self.captureOnCommitCallbacks(execute=True):
+                merged = self.notify()
+        self.assertEqual(merged.pk, first.pk)
+        self.assertEqual(merged.count, 2)
+        self.assertEqual(merged.message, "2 new comments on your post: 'Hill repeats'.")
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(notifications.unread_count(self.author.pk), 1)
+        self.assertNotEqual(realtime.notification_state(self.author.pk)[1], etag)
+        self.assertEqual(group_send.call_args.args[1]['id'], first.pk)
+
+    def test_read_notifications_start_a_new_row(self):
+        first = self.notify()
+        notifications.mark_all_read(self.author)
+        self.assertNotEqual(self.notify().pk, first.pk)
+        self.assertEqual(notifications.unread_count(self.author.pk), 1)
+
+    def test_prune_deletes_only_old_read_notifications(self):
+        old = timezone.now() - timedelta(days=90)
+        for read, created_at in ((True, old), (True, old), (False, old), (True, timezone.now())):
+            Notification.objects.create(user=self.author, message='m', read=read, created_at=created_at)
+        deleted = notifications.prune_read_notifications(timezone.now() - timedelta(days=30), batch_size=1)
+        self.assertEqual(deleted, 2)
+        self.assertEqual(Notification.objects.filter(read=True).count(), 1)
+        self.assertEqual(Notification.objects.filter(read=False).count(), 1)
+        self.assertEqual(notifications.reconcile_unread_counts(), 0)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user('author', password='pw')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_posts(author)
+
+    def create_posts(self, author):
+        for title, content in (
+            ('Hill repeats', '<p>Short climbs, marathon pace on the flat.</p>'),
+            ('Marathon training', '<p>Weekly plan for a first marathon.</p>'),
+            ('Café stops', '<p>Where to refuel after long runs; marathon gels.</p>'),
+            ('Recovery', '<p>Sleep &amp; stretching after hill sessions.</p>'),
+        ):
+            Post.objects.create(title=title, content=content, author=author)
+
+    def titles(self, query):
+        return [post.title for post in search.SearchResults(query)[:10]]
+
+    def check_queries(self):
+        # Title matches rank above body matches.
+        self.assertEqual(self.titles('marathon')[0], 'Marathon training')
+        self.assertEqual(set(self.titles('marathon')), {'Marathon training', 'Hill repeats', 'Café stops'})
+        # Terms match as prefixes ("hill" finds "hills"), and every term must match.
+        self.assertEqual(set(self.titles('hill')), {'Hill repeats', 'Recovery'})
+        self.assertEqual(self.titles('hill sleep'), ['Recovery'])
+        # Quotes and FTS operators in the query are plain text, not syntax.
+        self.assertEqual(self.titles('"marathon training'), ['Marathon training'])
+        self.assertEqual(self.titles('marathon" OR "recovery'), [])
+        self.assertEqual(self.titles('"" * -'), [])
+        self.assertEqual(search.SearchResults('').count(), 0)
+
+    def test_fts_index(self):
+        self.assertTrue(search.fts_available())
+        self.check_queries()
+        self.assertEqual(self.titles('cafe'), ['Café stops'])
+
+    def test_posting_lists(self):
+        with mock.patch.object(search, 'fts_available', return_value=False):
+            search.rebuild_index()
+            self.check_queries()
+
+    def test_migration_indexes_existing_posts(self):
+        migration = importlib.import_module('blog.migrations.0027_search_index')
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.FTS_TABLE}")
+        self.assertEqual(self.titles('marathon'), [])
+        migration.populate_search_index(django_apps, SimpleNamespace(connection=connection))
+        self.assertEqual(len(self.titles('marathon')), 3)
+
+
+class LiveUpdateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pw')
+        self.post = Post.objects.create(title='Hill repeats', content='<p>Hills</p>', author=self.author)
+        self.comments = [
+            Comment.objects.create(post=self.post, author=self.author, text=f'Comment {n}') for n in range(2)
+        ]
+
+    def test_votes_are_batched_per_post_before_fan_out(self):
+        with mock.patch.object(realtime, '_group_send') as group_send, \
+                mock.patch.object(realtime.threading, 'Timer') as timer:
+            realtime.broadcast_votes(self.comments[0], 1, 0)
+            realtime.broadcast_votes(self.comments[1], 0, 1)
+            realtime.broadcast_votes(self.comments[0], 2, 0)
+            self.assertEqual(timer.call_count, 1)
+            group_send.assert_not_called()
+
+            realtime.flush_votes(self.post.pk)
+            group_send.assert_called_once()
+            self.assertEqual(
+                group_send.call_args.args[1]['votes'],
+                {self.comments[0].pk: [2, 0], self.comments[1].pk: [0, 1]},
+            )
+
+            realtime.broadcast_votes(self.comments[1], 1, 1)
+            self.assertEqual(timer.call_count, 2)
+            realtime.flush_votes(self.post.pk)
+            self.assertEqual(group_send.call_args.args[1]['votes'], {self.comments[1].pk: [1, 1]})
+
+    def test_votes_numbered_before_their_slot_is_written_are_sent(self):
+        first, second = (comment.pk for comment in self.comments)
+        with mock.patch.object(realtime, '_group_send') as group_send, \
+                mock.patch.object(realtime.threading, 'Timer'):
+            realtime.broadcast_votes(self.comments[0], 1, 0)
+            # Slot 2 is numbered by a writer that has not stored it yet.
+            cache.incr(realtime._votes_key(self.post.pk, 'seq'))
+            realtime.broadcast_votes(self.comments[1], 0, 1)
+            realtime.flush_votes(self.post.pk)
+            self.assertEqual(group_send.call_args.args[1]['votes'], {first: [1, 0]})
+
+            cache.set(realtime._votes_key(self.post.pk, 2), (first, 2, 0))
+            realtime.flush_votes(self.post.pk)
+            self.assertEqual(group_send.call_args.args[1]['votes'], {first: [2, 0], second: [0, 1]})
+
+            # A slot that never arrives holds the queue for one flush only.
+            cache.incr(realtime._votes_key(self.post.pk, 'seq'))
+            realtime.broadcast_votes(self.comments[1], 1, 1)
+            realtime.flush_votes(self.post.pk)
+            self.assertEqual(group_send.call_count, 2)
+            realtime.flush_votes(self.post.pk)
+            self.assertEqual(group_send.call_args.args[1]['votes'], {second: [1, 1]})
+
+    def test_bulk_approval_broadcasts_every_comment(self):
+        for comment in self.comments:
+            comment.status = 'pending_review'
+            comment.save()
+        with mock.patch.object(realtime, '_group_send') as group_send:
+            with self.captureOnCommitCallbacks(execute=True):
+                moderation.decide(Comment.objects.filter(post=self.post), 'approve')
+        broadcast = [
+            message['id'] for group, message in (call.args for call in group_send.call_args_list)
+            if message['type'] == 'comment.new'
+        ]
+        self.assertEqual(sorted(broadcast), [comment.pk for comment in self.comments])
+
+
+class CounterTests(TestCase):
+    """The materialized counters follow every change without a reconcile."""
+
+    def setUp(self):
+        stats.reconcile()
+        self.author = User.objects.create_user('author', password='pw')
+        self.readers = [User.objects.create_user(f'reader{i}', password='pw') for i in range(3)]
+        self.post = Post.objects.create(title='Tempo runs', content='<p>Tempo</p>', author=self.author)
+
+    def assertNoDrift(self):
+        self.assertEqual(stats.reconcile(), 0)
+        self.assertEqual(profiles.reconcile(), 0)
+        self.assertEqual(notifications.reconcile_unread_counts(), 0)
+
+    def test_comment_lifecycle(self):
+        reader = self.readers[0]
+        comment = Comment.objects.create(post=self.post, author=reader, text='Pending', status='pending_review')
+        reply = Comment.objects.create(post=self.post, author=self.author, text='Reply', parent=comment)
+        self.assertNoDrift()
+
+        moderation.decide(Comment.objects.filter(pk=comment.pk), 'approve')
+        self.assertNoDrift()
+
+        self.client.force_login(self.author)
+        self.client.post(
+            reverse('comment_action'), {'comment_id': comment.pk, 'action': 'upvote'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(Comment.objects.get(pk=comment.pk).score, 1)
+        self.assertNoDrift()
+
+        for user in self.readers:
+            moderation.report(comment, user)
+        self.assertEqual(comment.status, 'hidden')
+        self.assertNoDrift()
+
+        moderation.decide(Comment.objects.filter(pk=comment.pk), 'reject')
+        self.assertNoDrift()
+
+        comment.text = 'Edited'
+        comment.status = 'approved'
+        comment.save()
+        self.assertEqual(Comment.objects.get(pk=comment.pk).score, 1)
+        self.assertNoDrift()
+
+        moderation.decide(Comment.objects.filter(pk=reply.pk), 'delete')
+        self.assertNoDrift()
+        Comment.objects.get(pk=comment.pk).delete()
+        self.assertNoDrift()
+
+    def test_post_and_user_lifecycle(self):
+        genre = Genre.objects.create(name='Training')
+        post = Post.objects.create(title='Long runs', content='<p>Long</p>', author=self.readers[0], genre=genre)
+        Comment.objects.create(post=post, author=self.readers[1], text='Nice')
+        self.assertNoDrift()
+
+        post.author = self.readers[1]
+        post.save()
+        self.assertNoDrift()
+
+        post.delete()
+        self.assertNoDrift()
+        self.readers[1].delete()
+        self.assertNoDrift()
+
+    def test_notification_lifecycle(self):
+        comment = Comment.objects.create(post=self.post, author=self.readers[0], text='Nice')
+        notifications.deliver([
+            Notification(user=self.author, notification_type='new_comment', message='m', comment=comment, post=self.post),
+            Notification(user=self.readers[1], notification_type='comment_approved', message='m', comment=comment),
+        ])
+        self.assertEqual(notifications.unread_count(self.author.pk), 1)
+        self.assertNoDrift()
+
+        notifications.mark_all_read(self.author)
+        self.assertNoDrift()
+
+        comment.delete()
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertNoDrift()
+
+    def test_saves_read_the_previous_row_once(self):
+        comment = Comment.objects.create(post=self.post, author=self.readers[0], text='Nice')
+        for instance in (comment, self.post):
+            table = connection.ops.quote_name(type(instance)._meta.db_table)
+            with CaptureQueriesContext(connection) as queries:
+                instance.save()
+            reads = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and f'FROM {table}' in q['sql']]
+            self.assertEqual(len(reads), 1, reads)
+
+    def test_raw_saves_leave_the_counters_alone(self):
+        comment = Comment.objects.create(post=self.post, author=self.readers[0], text='Nice')
+        data = serializers.serialize('json', [comment, self.post])
+        before = stats.get_stats(), list(Profile.objects.values_list('comment_count', 'post_count'))
+        Comment.objects.filter(pk=comment.pk).update(status='hidden')
+        for obj in serializers.deserialize('json', data):
+            obj.save()
+        after = stats.get_stats(), list(Profile.objects.values_list('comment_count', 'post_count'))
+        self.assertEqual(after, before)
+
+    def test_receivers_see_the_comment_path(self):
+        seen = []
+
+        def record_path(sender, instance, created, **kwargs):
+            if created:
+                seen.append(instance.path)
+
+        post_save.connect(record_path, sender=Comment)
+        self.addCleanup(post_save.disconnect, record_path, sender=Comment)
+        root = Comment.objects.create(post=self.post, author=self.author, text='Root')
+        reply = Comment.objects.create(post=self.post, author=self.author, text='Reply', parent=root)
+        stored = Comment.objects.filter(pk__in=[root.pk, reply.pk]).order_by('pk').values_list('path', flat=True)
+        self.assertEqual(seen, list(stored))
+        self.assertTrue(seen[1].startswith(seen[0]) and len(seen[1]) > len(seen[0]))
@@ -0,0 +1,377 @@
+# File: blog/threads.py
+"""
+Loads the visible comment thread of a post and assembles it into a tree.
+
+Top-level comments are paginated with a keyset cursor so every page costs the
+same no matter how long the discussion is. Each top-level comment previews
+only its first few direct replies, picked per comment in SQL, and only the
+subtrees of those replies are read, with one bounded (post, path) index range
+each; in path order every parent comes before its replies, so the tree is
+built in one pass.
+
+Comments a viewer has reported are hidden from them in Python with the
+cached set from ``reported_comment_ids``, so the thread queries themselves
+do not depend on who is reading.
+"""
+import base64
+import binascii
+import json
+import time
+from datetime import datetime
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import Count, F, Q, RowRange, Window
+from django.db.models.functions import RowNumber
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Comment
+
+
+SORT_OPTIONS = ('newest', 'oldest', 'top')
+COMMENTS_PER_PAGE = 10
+REPLY_PREVIEW_LIMIT = 3
+REPORTED_CACHE_TIMEOUT = 60 * 60
+
+# (ordering, field used in the cursor) for the top-level comments.
+_ORDERINGS = {
+    'newest': (('-created_at', '-id'), 'created_at'),
+    'oldest': (('created_at', 'id'), 'created_at'),
+    'top': (('-score', '-id'), 'score'),
+}
+
+
+def visibility_filter(user):
+    """
+    Approved comments for everyone, plus the viewer's own comments. Comments
+    the viewer reported are removed afterwards with ``is_visible_to``.
+    """
+    if user.is_authenticated:
+        return Q(status='approved') | Q(author=user)
+    return Q(status='approved')
+
+
+# ------------------ Reported comments ------------------
+def _reported_key(user_id):
+    return f"reported-comments:{user_id}"
+
+
+def reported_comment_ids(user):
+    """
+    The ids of the comments ``user`` has reported, read from the cache and
+    kept on the user object for the rest of the request.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(user, '_reported_comment_ids', None)
+    if ids is None:
+        ids = cache.get(_reported_key(user.pk))
+        if ids is None:
+            ids = frozenset(
+                Comment.reported_by.through.objects.filter(user_id=user.pk).values_list('comment_id', flat=True)
+            )
+            cache.set(_reported_key(user.pk), ids, REPORTED_CACHE_TIMEOUT)
+        user._reported_comment_ids = ids
+    return ids
+
+
+def forget_reported_comments(user):
+    cache.delete(_reported_key(user.pk))
+    user.__dict__.pop('_reported_comment_ids', None)
+
+
+def is_visible_to(comment, user):
+    """The part of the visibility rules that ``visibility_filter`` leaves out."""
+    return comment.author_id == user.pk or comment.pk not in reported_comment_ids(user)
+
+
+# ------------------ Cursors ------------------
+def _encode(value, pk):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = f"{value}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def encode_cursor(comment, sort_option):
+    return _encode(getattr(comment, _ORDERINGS[sort_option][1]), comment.pk)
+
+
+def decode_cursor(cursor, sort_option):
+    """Returns ``(value, pk)`` or ``None`` for a missing or malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        if _ORDERINGS[sort_option][1] == 'score':
+            value = int(value)
+        else:
+            value = datetime.fromisoformat(value)
+        return value, int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def _normalize_cursor(cursor, sort_option):
+    """The canonical form of ``cursor``, or ``None`` when it does not decode (the first page)."""
+    decoded = decode_cursor(cursor, sort_option)
+    return _encode(*decoded) if decoded else None
+
+
+def _after_cursor(sort_option, value, pk):
+    ordering, field = _ORDERINGS[sort_option]
+    op = 'lt' if ordering[0].startswith('-') else 'gt'
+    return Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': pk})
+
+
+# ------------------ Tree assembly ------------------
+def _sort_key(sort_option):
+    if sort_option == 'top':
+        return lambda c: (c.score, c.pk), True
+    if sort_option == 'oldest':
+        return lambda c: (c.created_at, c.pk), False
+    return lambda c: (c.created_at, c.pk), True
+
+
+def build_tree(comments, roots, sort_option='newest'):
+    """
+    Attaches a path-ordered list of replies to ``roots`` (and to each other)
+    through ``visible_replies``. Replies whose parent is not present (hidden,
+    rejected, reported) are dropped together with their whole subtree. Every
+    sibling group below the roots is sorted by ``sort_option``.
+    """
+    nodes = {}
+    for root in roots:
+        root.visible_replies = []
+        nodes[root.pk] = root
+
+    for comment in comments:
+        if comment.pk in nodes or comment.parent_id not in nodes:
+            continue
+        comment.visible_replies = []
+        nodes[comment.parent_id].visible_replies.append(comment)
+        nodes[comment.pk] = comment
+
+    key, reverse = _sort_key(sort_option)
+    for comment in nodes.values():
+        if len(comment.visible_replies) > 1:
+            comment.visible_replies.sort(key=key, reverse=reverse)
+    return roots
+
+
+def _annotate_votes(comments, user):
+    if not user.is_authenticated:
+        return
+    for comment in comments:
+        comment.user_has_upvoted = any(u.pk == user.pk for u in comment.upvotes.all())
+        comment.user_has_downvoted = any(u.pk == user.pk for u in comment.downvotes.all())
+
+
+def subtree_filter(post_id, paths):
+    """
+    The comments under any of ``paths`` (and those comments themselves), as
+    one bounded range of the (post, path) index per path. Segments are
+    lowercase hex, so every descendant of ``path`` sorts below ``path + 'g'``.
+    The post is repeated in every branch so SQLite seeks each range on its
+    own (a MULTI-INDEX OR) instead of scanning the whole post.
+    """
+    return reduce(or_, (Q(post_id=post_id, path__gte=path, path__lt=path + 'g') for path in paths))
+
+
+def _thread_queryset(scope, user):
+    return (
+        Comment.objects.filter(scope)
+        .filter(visibility_filter(user))
+        .select_related('author__profile')
+        .prefetch_related('upvotes', 'downvotes')
+    )
+
+
+# ------------------ Public API ------------------
+def load_thread_page(post, user, sort_option='newest', cursor=None, page_size=COMMENTS_PER_PAGE):
+    """
+    Returns ``(top_level_comments, next_cursor)`` for one page of ``post``'s
+    discussion as seen by ``user``. Each top-level comment carries up to
+    ``REPLY_PREVIEW_LIMIT`` direct replies (with their own replies) and a
+    ``more_replies`` count for the rest. ``next_cursor`` is ``None`` on the
+    last page.
+    """
+    if sort_option not in SORT_OPTIONS:
+        sort_option = 'newest'
+
+    roots = _thread_queryset(Q(post=post, parent__isnull=True), user)
+    after = decode_cursor(cursor, sort_option)
+    if after:
+        roots = roots.filter(_after_cursor(sort_option, *after))
+    roots = list(roots.order_by(*_ORDERINGS[sort_option][0])[:page_size + 1])
+
+    next_cursor = None
+    if len(roots) > page_size:
+        roots = roots[:page_size]
+        next_cursor = encode_cursor(roots[-1], sort_option)
+    # Dropped after the cursor is taken, so a page may come up short.
+    roots = [root for root in roots if is_visible_to(root, user)]
+
+    previews = _reply_previews(post, roots, user, sort_option)
+    replies = previews
+    if previews:
+        subtree = subtree_filter(post.pk, [preview.path for preview in previews])
+        descendants = (
+            _thread_queryset(subtree, user).exclude(pk__in=[preview.pk for preview in previews]).order_by()
+        )
+        # Sorted here: an ORDER BY over several ranges would need a temporary B-tree.
+        replies = sorted(
+            previews + [reply for reply in descendants if is_visible_to(reply, user)],
+            key=lambda reply: reply.path,
+        )
+
+    build_tree(replies, roots, sort_option)
+    for root in roots:
+        root.more_replies = max(getattr(root, 'reply_count', 0) - REPLY_PREVIEW_LIMIT, 0)
+    _annotate_votes(roots + replies, user)
+    return roots, next_cursor
+
+
+def _reply_previews(post, roots, user, sort_option):
+    """
+    The first ``REPLY_PREVIEW_LIMIT`` direct replies of each root in
+    ``sort_option`` order, cut off per root in SQL with a window over the
+    thread index; each root gets a ``reply_count`` of its visible replies.
+    """
+    if not roots:
+        return []
+    ordering = _ORDERINGS[sort_option][0]
+    previews = (
+        _thread_queryset(Q(post=post, parent__in=[root.pk for root in roots]), user)
+        .annotate(
+            preview_rank=Window(RowNumber(), partition_by=F('parent_id'), order_by=ordering),
+            # Same window as the rank (over the whole partition), so both come from one sort.
+            sibling_count=Window(
+                Count('pk'), partition_by=F('parent_id'), order_by=ordering, frame=RowRange(None, None),
+            ),
+        )
+        .filter(preview_rank__lte=REPLY_PREVIEW_LIMIT)
+        .order_by()
+    )
+    by_root = {root.pk: root for root in roots}
+    visible = []
+    for preview in previews:
+        by_root[preview.parent_id].reply_count = preview.sibling_count
+        # Replies the viewer reported still count, so a preview may come up short.
+        if is_visible_to(preview, user):
+            visible.append(preview)
+    return visible
+
+
+def load_replies(comment, user, sort_option='newest'):
+    """Returns every visible reply under ``comment`` as a sorted tree."""
+    if sort_option not in SORT_OPTIONS:
+        sort_option = 'newest'
+    replies = [
+        reply
+        for reply in _thread_queryset(subtree_filter(comment.post_id, [comment.path]), user)
+        .exclude(pk=comment.pk)
+        .order_by('path')
+        if is_visible_to(reply, user)
+    ]
+    build_tree(replies, [comment], sort_option)
+    _annotate_votes(replies, user)
+    return comment.visible_replies
+
+
+# ------------------ Fragment cache ------------------
+# Rendered pages are cached per (post, sort mode, cursor, thread version). Any
+# change to a comment of the post bumps the version, which retires every cached
+# page of that thread at once. Votes do not: open pages get new scores from the
+# vote stream, and cached pages pick them up within THREAD_CACHE_TIMEOUT. The
+# "top" sort is ordered by score, so its pages (and their score cursors) are
+# never cached. The cached body is rendered for an anonymous viewer; logged-in
+# viewers get the same body plus a small overlay with their own votes and
+# reports, applied in the browser.
+THREAD_CACHE_TIMEOUT = 60 * 5
+
+
+def _version_key(post_id):
+    return f"comment-thread-version:{post_id}"
+
+
+def get_thread_version(post_id):
+    version = cache.get(_version_key(post_id))
+    if version is None:
+        version = bump_thread_version(post_id)
+    return version
+
+
+def bump_thread_version(post_id):
+    version = time.time_ns()
+    cache.set(_version_key(post_id), version, None)
+    return version
+
+
+def viewer_overlay(user, comment_ids):
+    """Per-user state for the comments of a cached page."""
+    through = (Comment.upvotes.through, Comment.downvotes.through)
+    upvoted, downvoted = (
+        list(model.objects.filter(user=user, comment_id__in=comment_ids).values_list('comment_id', flat=True))
+        for model in through
+    )
+    reported = reported_comment_ids(user)
+    return {
+        'user_id': user.pk,
+        'is_staff': user.is_staff or user.is_superuser,
+        'upvoted': upvoted,
+        'downvoted': downvoted,
+        'reported': [pk for pk in comment_ids if pk in reported],
+    }
+
+
+def _has_private_comments(post, user):
+    """True when the viewer has comments on the post that only they can see."""
+    return Comment.objects.filter(post=post, author=user).exclude(status='approved').exists()
+
+
+def render_thread_page(request, post, sort_option='newest', cursor=None):
+    """
+    Returns ``(html, next_cursor)`` for one page of ``post``'s discussion,
+    shared by PostDetailView and the sort_comments endpoint.
+    """
+    user = request.user
+    if sort_option not in SORT_OPTIONS:
+        sort_option = 'newest'
+    # Any string that does not decode is the first page, so it shares its cache entry.
+    cursor = _normalize_cursor(cursor, sort_option)
+    context = {'post': post, 'sort': sort_option, 'is_continuation': bool(cursor)}
+
+    if sort_option == 'top' or (user.is_authenticated and _has_private_comments(post, user)):
+        comments, next_cursor = load_thread_page(post, user, sort_option, cursor)
+        context.update(comments=comments, next_cursor=next_cursor)
+        return render_to_string('blog/includes/comment_list.html', context, request=request), next_cursor
+
+    key = f"comment-thread:{post.pk}:{get_thread_version(post.pk)}:{sort_option}:{cursor or ''}"
+    cached = cache.get(key)
+    if cached is None:
+        comments, next_cursor = load_thread_page(post, AnonymousUser(), sort_option, cursor)
+        context.update(
+            comments=comments, next_cursor=next_cursor, thread_public=True, MEDIA_URL=settings.MEDIA_URL
+        )
+        html = render_to_string('blog/includes/comment_list.html', context)
+        comment_ids = [c.pk for root in comments for c in _walk(root)]
+        cached = (html, next_cursor, comment_ids)
+        cache.set(key, cached, THREAD_CACHE_TIMEOUT)
+
+    html, next_cursor, comment_ids = cached
+    if user.is_authenticated:
+        overlay = json.dumps(viewer_overlay(user, comment_ids))
+        html = mark_safe(f'{html}<script type="application/json" class="thread-overlay">{overlay}</script>')
+    return html, next_cursor
+
+
+def _walk(comment):
+    yield comment
+    for reply in comment.visible_replies:
+        yield from _walk(reply)
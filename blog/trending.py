@@ -0,0 +1,77 @@
+# File: blog/trending.py
+"""
+Time-decayed trending scores for posts.
+
+Each post accumulates engagement points (views, approved comments and votes
+on its comments) and its trending score is
+
+    engagement / (age_in_hours + 2) ** GRAVITY
+
+so new activity lifts a post while age steadily pulls it down. Events add
+their points and refresh the score of that one post in a single UPDATE; the
+``recompute_trending`` command re-applies the decay to every post (and can
+rebuild the engagement totals from scratch) in bulk SQL, and should run
+periodically so idle posts sink.
+"""
+from django.db import connection
+from django.db.models import Count, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Power
+
+from .models import Comment, Post
+
+
+GRAVITY = 1.8
+VIEW_POINTS = 0.1
+COMMENT_POINTS = 3
+VOTE_POINTS = 1
+
+# Hours since ``created_at``, evaluated by the database.
+_AGE_HOURS_SQL = {
+    'sqlite': "(julianday('now') - julianday(created_at)) * 24",
+    'postgresql': "EXTRACT(EPOCH FROM (NOW() - created_at)) / 3600",
+    'mysql': "TIMESTAMPDIFF(SECOND, created_at, UTC_TIMESTAMP()) / 3600",
+}
+
+
+def _decayed(engagement):
+    age = RawSQL(_AGE_HOURS_SQL[connection.vendor], [], output_field=FloatField())
+    return ExpressionWrapper(engagement / Power(age + 2, GRAVITY), output_field=FloatField())
+
+
+def record(post_id, points, **extra_updates):
+    """Adds ``points`` of engagement to a post and refreshes its score."""
+    engagement = F('engagement') + points
+    return Post.objects.filter(pk=post_id).update(
+        engagement=engagement, trending_score=_decayed(engagement), **extra_updates
+    )
+
+
+def _count_per_post(queryset, post_field):
+    """Correlated COUNT(*) of ``queryset`` rows per post, 0 when there are none."""
+    counts = queryset.order_by().values(post_field).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counts, output_field=FloatField()), Value(0.0))
+
+
+def recompute(rebuild_engagement=False):
+    """Re-applies the time decay to every post; returns the number of posts updated."""
+    if rebuild_engagement:
+        comments = _count_per_post(
+            Comment.objects.filter(post_id=OuterRef('pk'), status='approved'), 'post_id'
+        )
+        upvotes, downvotes = (
+            _count_per_post(through.objects.filter(comment__post_id=OuterRef('pk')), 'comment__post_id')
+            for through in (Comment.upvotes.through, Comment.downvotes.through)
+        )
+        Post.objects.update(
+            engagement=F('view_count') * VIEW_POINTS
+            + comments * COMMENT_POINTS
+            + (upvotes + downvotes) * VOTE_POINTS
+        )
+    return Post.objects.update(trending_score=_decayed(F('engagement')))
+
+
+def ranked_posts():
+    # Ties go to the newer id: the trending_score index carries the rowid, so
+    # the ranking is read in index order without a sort.
+    return Post.objects.order_by('-trending_score', '-pk')
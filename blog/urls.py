@@ -6,6 +6,7 @@ urlpatterns = [
     # --- Main Public Pages ---
     path('', views.PostListView.as_view(), name='post_list'),
     path('post/<int:pk>/', views.PostDetailView.as_view(), name='post_detail'),
+    path('genre/<int:pk>/', views.genre_posts, name='genre_posts'),
 
     # --- Static Pages (Public) ---
     path('about/', views.about, name='about'),
@@ -14,6 +15,7 @@ urlpatterns = [
 
     # --- Search & Profile (Public) ---
     path('search/', views.search_results, name='search_results'),
+    path('search/suggest/', views.search_suggestions, name='search_suggestions'),
     path('profile/<str:username>/', views.profile_page, name='profile_page'),
 
     # --- User Authentication ---
@@ -22,6 +24,7 @@ urlpatterns = [
 
     # --- PROTECTED User Actions ---
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/tabs/<str:tab>/', views.dashboard_tab, name='dashboard_tab'),
     path('profile/edit/', views.profile_edit, name='profile_edit'),
 
     # --- Post Management ---
@@ -31,11 +34,13 @@ urlpatterns = [
     path('notifications/mark-as-read/', views.mark_notifications_as_read, name='mark_notifications_as_read'),
     path('notifications/get-count/', views.get_notification_count, name='get_notification_count'),
     path('notifications/get-html/', views.get_notifications_html, name='get_notifications_html'),
+    path('notifications/poll/', views.poll_notifications, name='poll_notifications'),
     # --- Comment System ---
     path('post/<int:pk>/comment/', views.add_comment, name='add_comment'),
     path('comment/<int:pk>/edit/', views.edit_my_comment, name='edit_my_comment'),
     path("comment/reply/", views.reply_comment, name="reply_comment"),
     path('post/<int:pk>/sort_comments/', views.sort_comments, name='sort_comments'),
+    path('comment/<int:pk>/replies/', views.comment_replies, name='comment_replies'),
     #path('post/<int:pk>/get_comments/', views.get_comments_html, name='get_comments_html'),
 
 
@@ -46,7 +51,11 @@ urlpatterns = [
 
     # --- Admin Section ---
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin/users/search/', views.admin_user_search, name='admin_user_search'),
+    path('admin/posts/search/', views.admin_post_search, name='admin_post_search'),
     path('admin/comments/', views.admin_comments, name='admin_comments'),
+    path('admin/moderation/queue/', views.moderation_queue, name='moderation_queue'),
+    path('admin/moderation/decide/', views.moderate_comments, name='moderate_comments'),
     path('admin/comment/<int:pk>/approve/', views.approve_comment, name='approve_comment'),
     path('admin/comment/<int:pk>/delete/', views.delete_comment, name='delete_comment'),
     path('admin/assign-author/', views.assign_author_role, name='assign_author_role'),
@@ -1,4 +1,7 @@
+import asyncio
 
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin, PermissionRequiredMixin
@@ -11,9 +14,10 @@ from django.core.paginator import Paginator
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth.models import Group
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import Http404, JsonResponse, HttpResponseForbidden, HttpResponseNotModified
 from django.views.decorators.http import require_POST
 from django.template.loader import render_to_string
+from django.db import IntegrityError, transaction
 from django.db.models import F #
 from django.views.generic import DetailView
 from django.db.models import Count, Q
@@ -31,92 +35,102 @@ from .models import Post, Comment, Notification, Genre, Profile
 
 from .forms import PostForm, CommentForm, UserRegisterForm, UserUpdateForm, ProfileUpdateForm 
 from .ai_toxicity import toxicity_classifier 
+from . import homepage, moderation, profiles, trending
+from .dashboard import TABS as DASHBOARD_TABS, author_stats, tab_page
+from .notifications import deliver, mark_all_read, unread_count
+from .listings import card_queryset, posts_page
+from .related import related_posts
+from .realtime import notification_group, notification_state, broadcast_comment, broadcast_votes
+from .search import SearchResults
+from .stats import get_stats
+from .suggest import suggest
+from .threads import render_thread_page, load_replies, visibility_filter, is_visible_to
 from django.contrib.admin.views.decorators import staff_member_required
 
+NOTIFICATION_POLL_TIMEOUT = 25
+PROFILE_COMMENTS_PER_PAGE = 10
+
 
 # ==============================================================================
 # --- PUBLIC-FACING VIEWS (Visible to Everyone) ---
 # ==============================================================================
 
+def homepage_posts(sort_option=None):
+    """Post cards in the homepage's order: newest first, or ?sort=oldest / comments."""
+    queryset = card_queryset()
+    if sort_option == "oldest":
+        return queryset.order_by("created_at")
+    if sort_option == "comments":
+        # Order by approved comment count (annotated by card_queryset)
+        return queryset.order_by("-approved_comment_count", "-created_at")
+    return queryset.order_by("-created_at")
+
+
 class PostListView(ListView):
     model = Post
     template_name = 'blog/post_list.html'
     context_object_name = 'posts'
     paginate_by = 5
-    ordering = ['-created_at']  # default order: newest first
 
     def get_queryset(self):
-        # Start with the default queryset (newest first)
-        queryset = super().get_queryset()
-
-        # Check if the user requested a sort order
-        sort_option = self.request.GET.get("sort")
-
-        if sort_option == "oldest":
-            return queryset.order_by("created_at")
-
-        elif sort_option == "comments":
-            # Order by approved comment count
-            return queryset.annotate(
-                approved_comment_count=Count("comments", filter=Q(comments__status="approved"))
-            ).order_by("-approved_comment_count", "-created_at")
-
-        # Default: newest posts
-        return queryset
+        return homepage_posts(self.request.GET.get("sort"))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # ==============================================================
-        # === Featured Post (Admin picks first, fallback to smart pick)
-        # ==============================================================
-        featured_post = Post.objects.filter(is_featured=True).first()
-
-        if not featured_post:
-            featured_post = Post.objects.annotate(
-                approved_comment_count=Count("comments", filter=Q(comments__status="approved"))
-            ).order_by("-approved_comment_count", "-view_count").first()
-
-        context["featured_post"] = featured_post
-
-        # ==============================================================
-        # === Sidebar: Popular Posts (exclude featured post)
-        # ==============================================================
-        popular_posts_query = Post.objects.annotate(
-            approved_comment_count=Count("comments", filter=Q(comments__status="approved"))
-        ).order_by("-approved_comment_count", "-view_count")
-
-        if featured_post:
-            popular_posts_query = popular_posts_query.exclude(pk=featured_post.pk)
-
-        context["popular_posts"] = popular_posts_query[:5]
-
-        # Latest 5 approved comments
-        context["recent_comments"] = Comment.objects.filter(
-            status="approved"
-        ).order_by("-created_at")[:5]
-
+        # Featured post, popular sidebar and recent comments come from a
+        # cached snapshot (see blog/homepage.py).
+        context.update(homepage.get_snapshot())
         return context
 
 
 def ajax_post_list(request):
-    page_number = request.GET.get('page', 1)
-    posts_list = Post.objects.all().order_by('-created_at')
-    paginator = Paginator(posts_list, 6) # Use your paginate_by value
-    page_obj = paginator.get_page(page_number)
-    
+    """
+    Next page of post cards. Genre pages load more with a keyset cursor
+    (?cursor=, ?genre=<pk>); the homepage's numbered pages (?page=, ?sort=)
+    are served as well, with the same ordering and pagination markup.
+    """
+    if 'page' in request.GET:
+        paginator = Paginator(homepage_posts(request.GET.get('sort')), PostListView.paginate_by)
+        page = paginator.get_page(request.GET.get('page'))
+        posts_html = render_to_string('blog/includes/post_cards.html', {'page_obj': page, 'user': request.user})
+        pagination_html = render_to_string('blog/includes/pagination.html', {
+            'page_obj': page, 'paginator': paginator, 'is_paginated': page.has_other_pages(),
+        })
+        return JsonResponse({'posts_html': posts_html, 'pagination_html': pagination_html, 'next_cursor': None})
+
+    posts = card_queryset()
+    genre_id = request.GET.get('genre')
+    if genre_id and genre_id.isdigit():
+        posts = posts.filter(genre_id=genre_id)
+    page, next_cursor = posts_page(posts, request.GET.get('cursor'))
+
     posts_html = render_to_string(
         'blog/includes/post_cards.html', 
-        {'page_obj': page_obj, 'user': request.user}
+        {'page_obj': page, 'user': request.user}
     )
     pagination_html = render_to_string(
-        'blog/includes/pagination.html', 
-        {'page_obj': page_obj, 'paginator': paginator, 'is_paginated': True}
+        'blog/includes/load_more_posts.html',
+        {'next_cursor': next_cursor, 'genre_id': genre_id}
     )
     
     return JsonResponse({
         'posts_html': posts_html,
         'pagination_html': pagination_html,
+        'next_cursor': next_cursor,
+    })
+
+
+def genre_posts(request, pk):
+    genre = get_object_or_404(Genre, pk=pk)
+    posts, next_cursor = posts_page(
+        card_queryset(Post.objects.filter(genre=genre)), request.GET.get('cursor')
+    )
+    return render(request, 'blog/genre_posts.html', {
+        'genre': genre,
+        'page_obj': posts,
+        'next_cursor': next_cursor,
+        'genre_id': genre.pk,
     })
 
 class PostDetailView(DetailView):
@@ -127,50 +141,20 @@ class PostDetailView(DetailView):
     def get_object(self, queryset=None):
         # This is perfect, no changes needed.
         obj = super().get_object(queryset)
-        Post.objects.filter(pk=obj.pk).update(view_count=F("view_count") + 1)
+        trending.record(obj.pk, trending.VIEW_POINTS, view_count=F("view_count") + 1)
         obj.refresh_from_db()
         return obj
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        post = self.get_object()
-        user = self.request.user
-
-        if user.is_authenticated:
-            visibility_filter = (Q(status='approved') & ~Q(reported_by=user)) | Q(author=user)
-        else:
-            visibility_filter = Q(status='approved')
-
-        visible_replies_prefetch = Prefetch(
-            'replies',
-            queryset=Comment.objects.filter(visibility_filter).select_related('author__profile'),
-            to_attr='visible_replies' # Store the filtered replies in a new attribute
-        )
-
-        # 2. Get the base queryset of top-level comments, applying our new prefetch.
-        all_visible_comments = (
-            post.comments.filter(parent__isnull=True) # Start with top-level only
-            .filter(visibility_filter)
-            .select_related("author__profile")
-            .prefetch_related("upvotes", "downvotes", visible_replies_prefetch)
-        )
-
-        # The rest of your code is perfect and works on this corrected base query.
         sort_option = self.request.GET.get("sort", "newest")
-        if sort_option == "top":
-            comments = all_visible_comments.annotate(score=Count("upvotes") - Count("downvotes")).order_by("-score", "-created_at")
-        elif sort_option == "oldest":
-            comments = all_visible_comments.order_by("created_at")
-        else:
-            comments = all_visible_comments.order_by("-created_at")
 
-        if user.is_authenticated:
-            # This loop is also fine, as it runs on the final sorted list.
-            for comment in comments:
-                comment.user_has_upvoted = comment.upvotes.filter(pk=user.pk).exists()
-                comment.user_has_downvoted = comment.downvotes.filter(pk=user.pk).exists()
+        # Only the first page of top-level comments is rendered; the rest is
+        # fetched through sort_comments as the reader scrolls.
+        thread_html, _ = render_thread_page(self.request, self.object, sort_option)
 
-        context["comments"] = comments
+        context["thread_html"] = thread_html
+        context["related_posts"] = related_posts(self.object)
         context["form"] = CommentForm()
         context["sort"] = sort_option
         return context
@@ -212,6 +196,37 @@ def delete_inquiry(request, pk):
     messages.success(request, f"Inquiry from {inquiry.name} has been deleted.")
     return redirect('admin_inquiries')    
 
+def _add_vote(votes, comment_id, user_id):
+    """Inserts one vote row; returns 1, or 0 if it already existed."""
+    try:
+        with transaction.atomic():
+            votes.objects.create(comment_id=comment_id, user_id=user_id)
+    except IntegrityError:
+        return 0
+    return 1
+
+
+def _toggle_vote(comment, user, up):
+    """
+    Toggles ``user``'s up- or downvote on ``comment``, withdrawing a vote the
+    other way. The score, the author's vote total and trending move by the
+    vote rows actually deleted and inserted, so concurrent clicks that see
+    the same state cannot apply a change twice.
+    """
+    votes = (Comment.upvotes if up else Comment.downvotes).through
+    opposite = (Comment.downvotes if up else Comment.upvotes).through
+    sign = 1 if up else -1
+    with transaction.atomic():
+        withdrawn = opposite.objects.filter(comment_id=comment.pk, user_id=user.pk).delete()[0]
+        removed = votes.objects.filter(comment_id=comment.pk, user_id=user.pk).delete()[0]
+        added = 0 if removed else _add_vote(votes, comment.pk, user.pk)
+        delta = sign * (withdrawn + added - removed)
+        if delta:
+            Comment.objects.filter(pk=comment.pk).update(score=F("score") + delta)
+            profiles.adjust(comment.author_id, vote_total=delta)
+        trending.record(comment.post_id, (added - removed - withdrawn) * trending.VOTE_POINTS)
+
+
 @login_required
 @require_POST
 def comment_action(request):
@@ -223,24 +238,9 @@ def comment_action(request):
     user = request.user
     comment = get_object_or_404(Comment, pk=comment_id)
 
-    if action == "upvote":
-        if user in comment.downvotes.all():
-            comment.downvotes.remove(user)
-        if user in comment.upvotes.all():
-            comment.upvotes.remove(user)
-        else:
-            comment.upvotes.add(user)
-
-    
-    elif action == "downvote":
-        if user in comment.upvotes.all():
-            comment.upvotes.remove(user)
-        if user in comment.downvotes.all():
-            comment.downvotes.remove(user)
-        else:
-            comment.downvotes.add(user)
+    if action in ("upvote", "downvote"):
+        _toggle_vote(comment, user, up=action == "upvote")
 
-   
     elif action == "delete":
         if user == comment.author or user.is_superuser or user.is_staff:
             comment.delete()
@@ -265,7 +265,7 @@ def comment_action(request):
         return JsonResponse({
             "status": "reported",
             "message": "Your report has been submitted for review.",
-            "report_count": comment.reported_by.count(),
+            "report_count": comment.report_count,
             "user_has_reported": True,
             "is_hidden": (comment.status == "hidden"),  # frontend can fade it out
         })
@@ -275,56 +275,39 @@ def comment_action(request):
         return JsonResponse({"status": "error", "message": "Invalid action"}, status=400)
 
     
+    upvotes, downvotes = comment.upvotes.count(), comment.downvotes.count()
+    broadcast_votes(comment, upvotes, downvotes)
     return JsonResponse({
         "status": "ok",
-        "upvotes": comment.upvotes.count(),
-        "downvotes": comment.downvotes.count(),
+        "upvotes": upvotes,
+        "downvotes": downvotes,
     })
 
 def sort_comments(request, pk):
     post = get_object_or_404(Post, pk=pk)
-    user = request.user
-
- 
 
-    if user.is_authenticated:
-        visibility_filter = (Q(status='approved') & ~Q(reported_by=user)) | Q(author=user)
-    else:
-        visibility_filter = Q(status='approved')
+    sort_option = request.GET.get("sort", "newest")
+    html, next_cursor = render_thread_page(request, post, sort_option, request.GET.get("cursor"))
+    return JsonResponse({"html": html, "next_cursor": next_cursor})
 
-    # 2. Use the secure Prefetch object to fetch ONLY visible replies.
-    visible_replies_prefetch = Prefetch(
-        'replies',
-        queryset=Comment.objects.filter(visibility_filter).select_related('author__profile'),
-        to_attr='visible_replies'
+def comment_replies(request, pk):
+    """Returns the full reply tree of a comment whose preview was truncated."""
+    comment = get_object_or_404(
+        Comment.objects.select_related("post").filter(visibility_filter(request.user)), pk=pk
     )
+    if not is_visible_to(comment, request.user):
+        raise Http404("Comment not found")
+    sort_option = request.GET.get("sort", "newest")
+    replies = load_replies(comment, request.user, sort_option)
 
-    # 3. Get the base queryset of visible, top-level comments, applying the prefetch.
-    all_visible_comments = (
-        post.comments.filter(parent__isnull=True)
-        .filter(visibility_filter)
-        .select_related("author__profile")
-        .prefetch_related("upvotes", "downvotes", visible_replies_prefetch)
+    html = "".join(
+        render_to_string(
+            "blog/includes/comment.html",
+            {"comment": reply, "user": request.user, "post": comment.post, "sort": sort_option},
+            request=request,
+        )
+        for reply in replies
     )
-
-    # 4. Apply the sorting to this secure and correct base query.
-    sort_option = request.GET.get("sort", "newest")
-    if sort_option == "top":
-        comments = all_visible_comments.annotate(score=Count("upvotes") - Count("downvotes")).order_by("-score", "-created_at")
-    elif sort_option == "oldest":
-        comments = all_visible_comments.order_by("created_at")
-    else: # "newest"
-        comments = all_visible_comments.order_by("-created_at")
-
-    # Pre-calculate vote status for the user
-    if user.is_authenticated:
-        for comment in comments:
-            comment.user_has_upvoted = comment.upvotes.filter(pk=user.pk).exists()
-            comment.user_has_downvoted = comment.downvotes.filter(pk=user.pk).exists()
-
-    # The rest of the view is correct.
-    context = {"comments": comments, "user": user, "post": post}
-    html = render_to_string("blog/includes/comment_list.html", context, request=request)
     return JsonResponse({"html": html})
 
 @require_POST
@@ -397,26 +380,38 @@ def assign_author_role(request):
     return redirect('admin_dashboard')
 
 def search_results(request):
-    query = request.GET.get('q')
-    posts = Post.objects.filter(Q(title__icontains=query) | Q(content__icontains=query)).distinct().order_by('-created_at') if query else Post.objects.none()
-    return render(request, 'blog/search_results.html', {'posts': posts, 'query': query})
+    query = request.GET.get('q', '').strip()
+    # Ranked (BM25) results from the full-text index, one page at a time.
+    paginator = Paginator(SearchResults(query), 10)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'blog/search_results.html', {'posts': page_obj, 'page_obj': page_obj, 'query': query})
+
+def search_suggestions(request):
+    """Autocomplete for the navbar search box, answered from memory."""
+    return JsonResponse({'suggestions': suggest(request.GET.get('q', ''))})
 
 def profile_page(request, username):
     profile_user = get_object_or_404(User.objects.select_related('profile'), username=username)
-
-    # The get_or_create is still a good idea for users who haven't been viewed before.
-    Profile.objects.get_or_create(user=profile_user)
-    # This will now work
+    # Totals come from the profile's counters (see blog/profiles.py); the lists are paged.
+    posts, next_posts_cursor = posts_page(
+        card_queryset(Post.objects.filter(author=profile_user)), request.GET.get('posts')
+    )
+    comments, next_comments_cursor = posts_page(
+        Comment.objects.filter(author=profile_user, status='approved').select_related('post').defer('post__content'),
+        request.GET.get('comments'),
+        page_size=PROFILE_COMMENTS_PER_PAGE,
+    )
     context = {
         'profile_user': profile_user,
-        'posts': Post.objects.filter(author=profile_user).order_by('-created_at'),
-        'comments': Comment.objects.filter(author=profile_user, status='approved').order_by('-created_at'),
+        'posts': posts,
+        'next_posts_cursor': next_posts_cursor,
+        'comments': comments,
+        'next_comments_cursor': next_comments_cursor,
+        'show_comments': 'comments' in request.GET,
     }
-    return render(request, 'blog/profile_page.html', context) # You were missing a return here
+    return render(request, 'blog/profile_page.html', context)
 @login_required
 def profile_edit(request):
-    Profile.objects.get_or_create(user=request.user)
-
     if request.method == 'POST':
         u_form = UserUpdateForm(request.POST, instance=request.user)
         p_form = ProfileUpdateForm(request.POST, request.FILES, instance=request.user.profile)
@@ -637,6 +632,8 @@ def add_comment(request, pk):
     if not is_toxic:
         comment.status = "approved"
         comment.save()
+        broadcast_comment(comment)
+        trending.record(post.pk, trending.COMMENT_POINTS)
         message_for_commenter = "✅ Your comment was posted successfully."
         status_code = 200
 
@@ -651,12 +648,14 @@ def add_comment(request, pk):
             notif_message = f"{user.username} replied to your comment on '{post.title}'."
 
         if notification_recipient:
-            notification = Notification.objects.create(
+            # Merged into a recent unread notification about this post if there is one.
+            notification = deliver([Notification(
                 user=notification_recipient,
                 notification_type=notif_type,
                 message=notif_message,
                 comment=comment,
-            )
+                post=post,
+            )])[0]
             new_notification_html = render_to_string(
                 "blog/includes/notification_item.html",
                 {"notification": notification},
@@ -677,6 +676,7 @@ def add_comment(request, pk):
             notification_type="toxic_comment",
             message=f"Your comment on '{post.title}' requires editing.",
             comment=comment,
+            post=post,
         )
         new_notification_html = render_to_string(
             "blog/includes/notification_item.html",
@@ -684,7 +684,7 @@ def add_comment(request, pk):
             request=request,
         )
 
-        new_notification_count = Notification.objects.filter(user=user, read=False).count()
+        new_notification_count = unread_count(user.pk)
 
     # ---------------- CASE C: Highly toxic ----------------
     elif label == "highly-toxic":
@@ -703,9 +703,7 @@ def add_comment(request, pk):
 
     # === Notification count update (for all cases with recipients) ===
     if notification_recipient:
-        new_notification_count = Notification.objects.filter(
-            user=notification_recipient, read=False
-        ).count()
+        new_notification_count = unread_count(notification_recipient.pk)
 
     # === AJAX Response ===
     if is_ajax:
@@ -752,48 +750,39 @@ def dashboard(request):
         u_form = UserUpdateForm(instance=user)
         p_form = ProfileUpdateForm(instance=user.profile)
     
-    # --- Gather all other data for display ---
-    all_comments = Comment.objects.filter(author=user).order_by('-created_at')
-    notifications = Notification.objects.filter(user=user).order_by('-created_at')
-    notifications.filter(read=False).update(read=True)
+    # --- Badges and statistics only; the tabs load from dashboard_tab ---
     is_author = user.groups.filter(name='Authors').exists() or user.is_superuser
-    
     context = {
-        'all_comments': all_comments,
-        'action_required_comments': all_comments.filter(status='pending_review'),
-        'notifications': notifications,
+        'action_required_count': Comment.objects.filter(author=user, status='pending_review').count(),
+        'unread_count': user.profile.unread_notifications,
         'is_author': is_author,
         'u_form': u_form, # This will be either the blank form or the form with errors
         'p_form': p_form,
     }
 
     if is_author:
-        user_posts = Post.objects.filter(author=user).order_by('-created_at')
-        context['user_posts'] = user_posts
-        if user_posts.exists():
-            first_post = user_posts.order_by('created_at').first()
+        stats = author_stats(user)
+        if stats:
             context['author_stats'] = {
-                'total_posts': user_posts.count(),
-                'total_comments_received': Comment.objects.filter(post__in=user_posts).count(),
-                'time_as_author': timezone.now() - first_post.created_at
+                'total_posts': stats['total_posts'],
+                'total_comments_received': stats['total_comments_received'],
+                'time_as_author': timezone.now() - stats['first_post_at'],
             }
-    
+
     return render(request, 'blog/dashboard.html', context)
-def get_featured_post():
-    
-    recent_date = datetime.now() - timedelta(days=7)
-    
-    return Post.objects.filter(
-        created_at__gte=recent_date,
-        status='published'  # assuming you have status field
-    ).annotate(
-        comment_count=Count('comment'),
-        engagement_score=(
-            Count('comment') * 3 +  
-            Count('upvotes') * 1 +  
-            F('view_count') * 0.1   
-        )
-    ).order_by('-engagement_score', '-created_at').first()
+
+@login_required
+def dashboard_tab(request, tab):
+    """One page of a dashboard tab as rendered list items."""
+    if tab not in DASHBOARD_TABS:
+        raise Http404("Unknown tab")
+    items, next_cursor = tab_page(request.user, tab, request.GET.get("cursor"))
+    html = render_to_string(
+        "blog/includes/dashboard_tab.html",
+        {"tab": tab, "items": items, "is_continuation": bool(request.GET.get("cursor"))},
+        request=request,
+    )
+    return JsonResponse({"html": html, "next_cursor": next_cursor})
 
 @login_required
 def admin_dashboard(request):
@@ -801,49 +790,79 @@ def admin_dashboard(request):
         messages.error(request, "You do not have permission to view this page.")
         return redirect("post_list")
 
-   
-    author_group, _ = Group.objects.get_or_create(name="Authors")
-    potential_authors = User.objects.filter(is_superuser=False).exclude(groups=author_group)
-    bannable_users = User.objects.filter(is_superuser=False)
-    banned_users = User.objects.filter(profile__comment_ban_until__gt=timezone.now())
-
-
-    comments_to_moderate_query = Comment.objects.filter(
-        Q(status='pending_review') | Q(status='hidden')
-    ).distinct()
-    
-    stats = {
-        "total_posts": Post.objects.count(),
-        "total_comments": Comment.objects.count(),
-        "total_users": User.objects.count(),
-        "posts_with_photos": Post.objects.exclude(photo="").count(),
-        "comments_to_moderate_count": comments_to_moderate_query.count(),
-        "banned_users_count": banned_users.count(),
-        "new_inquiries_count": UserInquiry.objects.filter(status='new').count(),
-    }
+    # Counters come from the materialized stats table (see blog/stats.py); bans
+    # expire with time, so they are counted live over the ban index.
+    banned_users = list(
+        User.objects.filter(profile__comment_ban_until__gt=timezone.now()).select_related("profile")
+    )
+    stats = get_stats()
+    stats["banned_users_count"] = len(banned_users)
 
     # --- Data for dashboard sections ---
-    moderation_queue = comments_to_moderate_query.order_by("-created_at")[:5]
-    recent_posts = Post.objects.order_by("-created_at")[:5]
-    recent_approved_comments = Comment.objects.filter(status="approved").order_by("-created_at")[:5]
-    all_posts = Post.objects.all()
-    currently_featured_post = Post.objects.filter(is_featured=True).first()
+    # The user and post pickers load their options from admin_user_search and
+    # admin_post_search as the admin types.
+    moderation_queue, _ = moderation.queue_page(page_size=5)
+    recent_posts = card_queryset()[:5]
+    recent_approved_comments = (
+        Comment.objects.filter(status="approved").select_related("author").order_by("-created_at")[:5]
+    )
+    currently_featured_post = next(iter(Post.objects.filter(is_featured=True).only("pk", "title").order_by()[:1]), None)
 
     # --- Render page ---
     context = {
         "stats": stats,
-        "potential_authors": potential_authors,
-        "bannable_users": bannable_users,
         "banned_users": banned_users,
         "moderation_queue": moderation_queue,
         "recent_posts": recent_posts,
         "recent_approved_comments": recent_approved_comments,
-        "all_posts": all_posts,
         "currently_featured_post": currently_featured_post,
     }
 
     return render(request, "blog/admin_dashboard.html", context)
 
+ADMIN_PICKER_PAGE_SIZE = 20
+
+
+@login_required
+def admin_user_search(request):
+    """Paginated username autocomplete for the dashboard's promote and ban pickers."""
+    if not request.user.is_superuser:
+        return HttpResponseForbidden()
+    users = User.objects.filter(is_superuser=False, username__istartswith=request.GET.get("q", "").strip())
+    if request.GET.get("scope") == "promote":
+        users = users.exclude(groups__name="Authors")
+    cursor = request.GET.get("cursor")
+    if cursor:
+        users = users.filter(username__gt=cursor)
+    page = list(users.order_by("username").values("pk", "username")[:ADMIN_PICKER_PAGE_SIZE + 1])
+    has_more = len(page) > ADMIN_PICKER_PAGE_SIZE
+    page = page[:ADMIN_PICKER_PAGE_SIZE]
+    return JsonResponse({
+        "results": [{"id": u["pk"], "label": u["username"]} for u in page],
+        "next_cursor": page[-1]["username"] if has_more else None,
+    })
+
+
+@login_required
+def admin_post_search(request):
+    """Paginated title autocomplete for the featured-post picker, newest first."""
+    if not request.user.is_superuser:
+        return HttpResponseForbidden()
+    posts = Post.objects.filter(is_featured=False)
+    query = request.GET.get("q", "").strip()
+    if query:
+        posts = posts.filter(title__icontains=query)
+    cursor = request.GET.get("cursor", "")
+    if cursor.isdigit():
+        posts = posts.filter(pk__lt=int(cursor))
+    page = list(posts.order_by("-pk").values("pk", "title")[:ADMIN_PICKER_PAGE_SIZE + 1])
+    has_more = len(page) > ADMIN_PICKER_PAGE_SIZE
+    page = page[:ADMIN_PICKER_PAGE_SIZE]
+    return JsonResponse({
+        "results": [{"id": p["pk"], "label": p["title"]} for p in page],
+        "next_cursor": str(page[-1]["pk"]) if has_more else None,
+    })
+
 @login_required
 @require_POST # This view only accepts POST requests
 def set_featured_post(request):
@@ -891,21 +910,59 @@ def admin_comments(request):
     if not request.user.is_superuser:
         messages.error(request, "You do not have permission to access this page.")
         return redirect('post_list')
-    comments_to_moderate = Comment.objects.annotate(
-        report_count=Count('reported_by')
-    ).filter(
-        Q(status='pending_review') | Q(status='hidden')
-    ).distinct().order_by('-created_at')
-    
-    paginator = Paginator(comments_to_moderate, 10)
-    page_obj = paginator.get_page(request.GET.get('page'))
-    return render(request, 'blog/admin_comments.html', {'comments': page_obj})
+    comments, next_cursor = moderation.queue_page(request.GET.get('cursor'))
+    return render(request, 'blog/admin_comments.html', {
+        'comments': comments,
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor'),
+    })
+
+@login_required
+def moderation_queue(request):
+    """JSON pages of the moderation queue, most reported and oldest first."""
+    if not request.user.is_superuser:
+        return HttpResponseForbidden()
+    comments, next_cursor = moderation.queue_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [
+            {
+                'id': c.pk,
+                'text': c.text,
+                'status': c.status,
+                'report_count': c.report_count,
+                'created_at': c.created_at.isoformat(),
+                'author': c.author.username,
+                'post': {'id': c.post_id, 'title': c.post.title},
+            }
+            for c in comments
+        ],
+        'next_cursor': next_cursor,
+    })
+
+@login_required
+@require_POST
+def moderate_comments(request):
+    """Applies one decision (approve, reject or delete) to many comments at once."""
+    if not request.user.is_superuser:
+        return HttpResponseForbidden()
+    decision = request.POST.get('decision')
+    comment_ids = [int(pk) for pk in request.POST.getlist('comment_ids') if pk.isdigit()]
+    if decision not in moderation.DECISIONS or not comment_ids:
+        if request.headers.get("x-requested-with") == "XMLHttpRequest":
+            return JsonResponse({"status": "error", "message": "Choose comments and a decision."}, status=400)
+        messages.error(request, "Choose comments and a decision.")
+        return redirect('admin_comments')
+    changed = moderation.decide(Comment.objects.filter(pk__in=comment_ids[:moderation.MAX_DECISIONS]), decision)
+    if request.headers.get("x-requested-with") == "XMLHttpRequest":
+        return JsonResponse({"status": "ok", "decision": decision, "changed": changed})
+    messages.success(request, f"{decision.capitalize()}: {changed} comment(s).")
+    return redirect('admin_comments')
 
 @login_required
 def approve_comment(request, pk):
     if not request.user.is_superuser: return redirect('post_list')
-    comment = get_object_or_404(Comment, pk=pk); comment.status = 'approved'; comment.save()
-    Notification.objects.create(user=comment.author, message=f"Your comment on '{comment.post.title}' has been approved by an admin.", comment=comment)
+    comment = get_object_or_404(Comment, pk=pk)
+    moderation.decide(Comment.objects.filter(pk=comment.pk), 'approve')
     messages.success(request, 'Comment approved successfully.')
     return redirect('admin_comments')
 
@@ -914,22 +971,60 @@ def approve_comment(request, pk):
 def mark_notifications_as_read(request):
     if request.headers.get("x-requested-with") == "XMLHttpRequest":
         # Mark all of the user's unread notifications as read
-        Notification.objects.filter(user=request.user, read=False).update(read=True)
+        mark_all_read(request.user)
         return JsonResponse({'status': 'ok'})
     return HttpResponseForbidden()
 @login_required
 def get_notification_count(request):
     """A simple, lightweight view to return the unread notification count."""
     if request.headers.get("x-requested-with") == "XMLHttpRequest":
-        count = Notification.objects.filter(user=request.user, read=False).count()
+        count = unread_count(request.user.pk)
         return JsonResponse({'unread_count': count})
     return HttpResponseForbidden()
 @login_required
+async def poll_notifications(request):
+    """
+    Long-polling fallback for browsers without WebSocket support.
+    The client sends the ETag of the state it already shows; the response
+    is held until a notification arrives or NOTIFICATION_POLL_TIMEOUT passes,
+    and is a 304 if nothing changed.
+    """
+    if request.headers.get("x-requested-with") != "XMLHttpRequest":
+        return HttpResponseForbidden()
+
+    user = await request.auser()
+    known_etag = request.headers.get("If-None-Match")
+    layer = get_channel_layer()
+    channel = None
+    if layer is not None:
+        # Join the group before reading the state so nothing slips in between.
+        channel = await layer.new_channel()
+        await layer.group_add(notification_group(user.pk), channel)
+
+    try:
+        count, etag = await sync_to_async(notification_state)(user.pk)
+        if etag == known_etag and channel is not None:
+            try:
+                await asyncio.wait_for(layer.receive(channel), NOTIFICATION_POLL_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            count, etag = await sync_to_async(notification_state)(user.pk)
+    finally:
+        if channel is not None:
+            await layer.group_discard(notification_group(user.pk), channel)
+
+    if etag == known_etag:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({'unread_count': count})
+    response["ETag"] = etag
+    return response
+@login_required
 def get_notifications_html(request):
     
     if request.headers.get("x-requested-with") == "XMLHttpRequest":
         
-        notifications = Notification.objects.filter(user=request.user).order_by('-created_at')[:5]
+        notifications = Notification.objects.filter(user=request.user).select_related('comment').order_by('-created_at')[:5]
         html = render_to_string(
             'blog/includes/notification_list.html',
             {'notifications': notifications}
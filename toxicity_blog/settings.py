@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import logging
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -32,6 +33,8 @@ ALLOWED_HOSTS =["*"]
 # Application definition
 
 INSTALLED_APPS = [
+    # Listed first so runserver serves the ASGI app (HTTP and WebSockets).
+    "daphne",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -98,6 +101,36 @@ LOGGING = {
     },
 }
 WSGI_APPLICATION = "toxicity_blog.wsgi.application"
+ASGI_APPLICATION = "toxicity_blog.asgi.application"
+
+# Channels: the in-memory layer only delivers within one process, which is
+# enough for development and single-node deploys; with several workers set
+# REDIS_URL and run the ASGI app with e.g. ``daphne toxicity_blog.asgi:application``.
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [REDIS_URL]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
+    if not DEBUG:
+        logging.getLogger(__name__).warning(
+            "REDIS_URL is not set: live updates use the in-memory channel layer "
+            "and only reach clients connected to the same process."
+        )
+
+# Notifications: comment/reply notifications about the same post are merged
+# into one unread row within this many seconds; read notifications older than
+# NOTIFICATION_RETENTION_DAYS are removed by `manage.py prune_notifications`.
+NOTIFICATION_COALESCE_WINDOW = 60 * 60
+NOTIFICATION_RETENTION_DAYS = 90
 
 
 # Database
@@ -110,6 +143,17 @@ DATABASES = {
     }
 }
 
+# Cache
+# Rendered comment threads and other derived data live here. Use a shared
+# backend (e.g. Redis or Memcached) when running more than one process.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "toxicity-blog",
+    }
+}
+
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "toxicity_blog.settings")
 
 application = get_wsgi_application()
+
+# Build the in-memory search suggestions before the first request needs them.
+from blog.suggest import warm  # noqa: E402
+
+warm()